@@ -2,10 +2,6 @@ import time
 import os
 import sys
 import re
-import joblib
-import pandas as pd
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
 # Adăugăm calea către backend
@@ -13,34 +9,28 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from ai.local_vision import analyze_image_local
 from app.models import Listing 
+from app.database import SessionLocal
+from app.query_cache import notify_listings_changed, query_cache
+from app.market_stats import NeighborhoodStats
+from app.comparables import comparable_price_sqm, find_comparables
+from app.valuation import normalize_features, predict_prices, price_model_store
 
 # Configurare DB
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
-DATABASE_URL = os.getenv("DATABASE_URL")
 
 # --- INCARCARE MODEL AI DE PRET ---
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'price_model.joblib')
-PRICE_MODEL = None
-
-if os.path.exists(MODEL_PATH):
-    try:
-        PRICE_MODEL = joblib.load(MODEL_PATH)
-        print("🧠 Modelul de preț (ML) a fost încărcat cu succes!")
-    except Exception as e:
-        print(f"⚠️ Nu am putut încărca modelul de preț: {e}")
+# Acelasi store ca in API: aceleasi feature-uri + reincarcare la re-antrenare
+if price_model_store.load():
+    print("🧠 Modelul de preț (ML) a fost încărcat cu succes!")
 else:
-    print("⚠️ Modelul de preț nu există. Voi folosi medii statice.")
+    print("⚠️ Modelul de preț nu există. Voi folosi mediana pe cartier (neighborhood_stats).")
 
-# Fallback prices (în caz că modelul dă rateuri sau nu e încărcat)
-AVERAGE_PRICES = {
-    "copou": 2200, "centru": 2300, "pacurari": 1600, "tatarasi": 1500, 
-    "nicolina": 1450, "cug": 1300, "bucium": 1200, "dacia": 1400, 
-    "alexandru": 1400, "galata": 1300, "miroslava": 1100, "rediu": 1100
-}
+def load_market_stats(db):
+    """Mediane pe cartier din view-ul materializat (un SELECT mic, o data per batch)."""
+    return NeighborhoodStats.load_or_empty(db)
 
 def get_db():
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(bind=engine)
+    # Engine-ul (si pool-ul) e comun, nu mai cream unul nou la fiecare iteratie
     return SessionLocal()
 
 def extract_year_from_text(text):
@@ -52,29 +42,36 @@ def extract_year_from_text(text):
 
 def predict_fair_price(listing, ai_tag):
     """Folosește modelul ML pentru a prezice prețul corect."""
-    if not PRICE_MODEL:
+    model = price_model_store.get()
+    if not model:
         return None
     
     try:
-        # Construim un DataFrame cu un singur rând (exact ca la antrenare)
-        input_data = pd.DataFrame([{
-            'sqm': listing.sqm,
-            'rooms': listing.rooms,
-            'floor': listing.floor if listing.floor is not None else 1,
-            'year_built': listing.year_built,
-            'neighborhood': listing.neighborhood.lower() if listing.neighborhood else 'iasi',
-            'compartmentation': listing.compartmentation.lower() if listing.compartmentation else 'nedecomandat',
-            'condition': ai_tag # AICI E CHEIA: Modelul știe starea!
-        }])
-        
-        # Facem predicția
-        predicted_price = PRICE_MODEL.predict(input_data)[0]
-        return int(predicted_price)
+        # Aceleasi feature-uri (si aceleasi valori implicite) ca la antrenare si ca in API
+        features = normalize_features(
+            listing.sqm, listing.rooms, listing.floor, listing.year_built,
+            listing.neighborhood, listing.compartmentation,
+            ai_tag # AICI E CHEIA: Modelul știe starea!
+        )
+        return predict_prices(model, [features])[0]
     except Exception as e:
         # print(f"Eroare predicție model: {e}")
         return None
 
-def calculate_investment_metrics(listing, ai_tag):
+# Sub atatea comparabile nu ne bazam pe mediana lor (folosim mediana cartierului)
+MIN_COMPARABLES = 3
+
+def find_listing_comparables(db, listing):
+    """Aceleasi comparabile ca in raportul CMA (KNN pe geom + distanta ponderata)."""
+    try:
+        # SAVEPOINT: o eroare aici nu anuleaza modificarile deja facute pe anunt
+        with db.begin_nested():
+            return find_comparables(db, listing)
+    except Exception as e:
+        print(f"      ⚠️ Eroare comparabile: {e}")
+        return []
+
+def calculate_investment_metrics(listing, ai_tag, market, comparables=()):
     """Calculează date financiare premium folosind AI."""
     price = listing.price_eur or 0
     sqm = listing.sqm or 0
@@ -85,15 +82,10 @@ def calculate_investment_metrics(listing, ai_tag):
     # 1. AI VALUATION (Prețul Corect)
     fair_price = predict_fair_price(listing, ai_tag)
     
-    # Dacă modelul nu merge, folosim media zonei (Fallback)
+    # Dacă modelul nu merge: mediana comparabilelor, apoi mediana zonei (Fallback)
     if not fair_price:
-        zone_lower = listing.neighborhood.lower() if listing.neighborhood else ""
-        avg_zone_sqm = 1500
-        for z, p in AVERAGE_PRICES.items():
-            if z in zone_lower:
-                avg_zone_sqm = p
-                break
-        fair_price = int(sqm * avg_zone_sqm)
+        comps_sqm = comparable_price_sqm(comparables) if len(comparables) >= MIN_COMPARABLES else None
+        fair_price = int(sqm * (comps_sqm or market.median_price_sqm(listing.neighborhood, "SALE")))
     
     fair_price_sqm = int(fair_price / sqm)
 
@@ -113,11 +105,8 @@ def calculate_investment_metrics(listing, ai_tag):
 
     total_investment = price + renovation_cost
 
-    # 4. ESTIMARE CHIRIE & YIELD
-    rent_per_sqm = 7
-    zone_lower = listing.neighborhood.lower() if listing.neighborhood else ""
-    if any(z in zone_lower for z in ['copou', 'centru', 'palas']): rent_per_sqm = 11
-    elif any(z in zone_lower for z in ['pacurari', 'tatarasi', 'nicolina']): rent_per_sqm = 8.5
+    # 4. ESTIMARE CHIRIE & YIELD (mediana chiriilor active din cartier)
+    rent_per_sqm = market.median_price_sqm(listing.neighborhood, "RENT")
     
     if ai_tag in ['luxury', 'modern']: rent_per_sqm *= 1.2
     
@@ -134,7 +123,8 @@ def calculate_investment_metrics(listing, ai_tag):
             "avg_price_sqm": fair_price_sqm, # Aici punem ce crede AI-ul că e corect / mp
             "listing_price_sqm": int(price_per_sqm),
             "status": market_position,
-            "fair_total_price": fair_price # Trimitem și totalul estimat
+            "fair_total_price": fair_price, # Trimitem și totalul estimat
+            "comparable_ids": [c.listing.id for c in comparables]
         }
     }
 
@@ -142,6 +132,8 @@ def process_pending_images():
     print("🤖 AI Worker pornit. Caut anunțuri neprocesate...")
     
     while True:
+        # Modelul re-antrenat intre timp e preluat fara restart
+        price_model_store.maybe_reload()
         db = get_db()
         try:
             # Luăm câte 10 ca să nu blocăm memoria
@@ -158,6 +150,7 @@ def process_pending_images():
                 continue
                 
             print(f"🚀 Procesez un batch de {len(listings)} anunțuri...")
+            market = load_market_stats(db)
 
             for listing in listings:
                 print(f"   --> Analizez ID {listing.id} ({listing.title[:20]}...)...")
@@ -189,7 +182,8 @@ def process_pending_images():
 
                     # D. CALCUL PREMIUM (Investiție)
                     try:
-                        investment_data = calculate_investment_metrics(listing, final_tag)
+                        comparables = find_listing_comparables(db, listing)
+                        investment_data = calculate_investment_metrics(listing, final_tag, market, comparables)
                         if investment_data:
                             ai_result['investment'] = investment_data
                             print(f"      💰 Fair Price: {investment_data['market_comparison']['fair_total_price']}€ | Yield: {investment_data['yield_percent']}%")
@@ -208,6 +202,11 @@ def process_pending_images():
                     listing.ai_tags = {"error": "image_download_failed", "top_tag": "unknown"}
                     db.commit()
 
+            # Tag-urile/estimarile noi apar in cautari: invalidam cache-ul API-ului o data per batch
+            notify_listings_changed(db, "ai_worker")
+            db.commit()
+            query_cache.bump()  # generatia comuna din Redis, o singura data per batch
+
         except Exception as e:
             print(f"⚠️ Eroare în bucla AI: {e}")
             db.rollback()
@@ -143,7 +143,11 @@ def train_price_predictor():
 
         # 5. SALVARE
         save_path = os.path.join(os.path.dirname(__file__), 'price_model.joblib')
-        joblib.dump(model, save_path)
+        # Scriem alaturi si inlocuim atomic: API-ul nu citeste niciodata un fisier scris
+        # pe jumatate si reincarca singur modelul cand vede fisierul nou.
+        tmp_path = f"{save_path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, save_path)
         print(f"💾 Model salvat în: {save_path}")
 
     except Exception as e:
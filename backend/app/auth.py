@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import jwt
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException
+from supabase import create_client, Client
+
+load_dotenv()
+
+# --- CONFIGURARE SUPABASE ---
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# Verificare locala a JWT-ului:
+#  - proiectele cu "JWT secret" semneaza HS256 -> SUPABASE_JWT_SECRET
+#  - proiectele cu chei asimetrice (RS256/ES256) -> JWKS, descarcat o data si tinut in cache
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+
+# Cache-ul de tokenuri deja validate (TTL-ul nu depaseste niciodata expirarea tokenului)
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# Daca e activ, la cache miss confirmam tokenul si la Supabase (prinde sesiunile revocate)
+AUTH_REMOTE_CHECK = os.getenv("AUTH_REMOTE_CHECK", "false").lower() == "true"
+
+try:
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+except Exception as e:
+    supabase = None
+    print(f"Eroare la initializarea Supabase: {e}")
+
+
+@dataclass
+class AuthUser:
+    id: str
+    email: Optional[str] = None
+    user_metadata: dict = field(default_factory=dict)
+
+
+_token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+_cache_lock = threading.Lock()
+_jwks_client = None
+
+
+def clear_token_cache():
+    with _cache_lock:
+        _token_cache.clear()
+
+
+def _get_jwks_client():
+    global _jwks_client
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(SUPABASE_JWKS_URL, cache_keys=True, lifespan=3600)
+    return _jwks_client
+
+
+def _decode_local(token: str) -> Optional[dict]:
+    """Returneaza claim-urile verificate sau None daca nu avem cu ce verifica local."""
+    alg = jwt.get_unverified_header(token).get("alg")
+
+    if alg == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            return None
+        key = SUPABASE_JWT_SECRET
+    elif alg in ("RS256", "ES256"):
+        if not SUPABASE_JWKS_URL:
+            return None
+        key = _get_jwks_client().get_signing_key_from_jwt(token).key
+    else:
+        raise jwt.InvalidAlgorithmError(f"Algoritm nesuportat: {alg}")
+
+    return jwt.decode(
+        token, key, algorithms=[alg], audience=SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]}
+    )
+
+
+def _fetch_remote(token: str) -> AuthUser:
+    if supabase is None:
+        raise HTTPException(status_code=503, detail="Auth indisponibil")
+    try:
+        user = supabase.auth.get_user(token).user
+    except Exception as e:
+        print(f"Auth Error: {e}")
+        raise HTTPException(status_code=401, detail="Invalid Token")
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid Token")
+    return AuthUser(id=str(user.id), email=user.email, user_metadata=user.user_metadata or {})
+
+
+def verify_token(token: str) -> AuthUser:
+    now = time.time()
+    with _cache_lock:
+        cached = _token_cache.get(token)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    try:
+        claims = _decode_local(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expirat")
+    except (jwt.InvalidTokenError, jwt.PyJWKClientError) as e:
+        print(f"Auth Error: {e}")
+        raise HTTPException(status_code=401, detail="Invalid Token")
+
+    if claims is None or AUTH_REMOTE_CHECK:
+        # Fallback: nu putem verifica local (sau vrem confirmare de revocare)
+        user = _fetch_remote(token)
+        expires_at = claims["exp"] if claims else now + AUTH_CACHE_TTL
+    else:
+        user = AuthUser(
+            id=str(claims["sub"]),
+            email=claims.get("email"),
+            user_metadata=claims.get("user_metadata") or {}
+        )
+        expires_at = claims["exp"]
+
+    with _cache_lock:
+        _token_cache[token] = (user, expires_at)
+    return user
+
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing Token")
+    parts = authorization.split(" ")
+    if len(parts) != 2 or not parts[1]:
+        raise HTTPException(status_code=401, detail="Invalid Token")
+    return parts[1]
+
+
+# --- DEPENDINTE FASTAPI ---
+def get_current_user(authorization: str = Header(None)) -> AuthUser:
+    return verify_token(_bearer_token(authorization))
+
+
+def get_optional_user(authorization: str = Header(None)) -> Optional[AuthUser]:
+    """Pentru endpoint-urile care merg si fara login (ex: is_favorited)."""
+    if not authorization:
+        return None
+    try:
+        return get_current_user(authorization)
+    except HTTPException:
+        return None
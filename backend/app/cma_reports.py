@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+# --- CONFIGURARE ---
+# Director comun pentru toti workerii de pe masina: un raport generat de un worker
+# poate fi descarcat prin oricare altul.
+CMA_REPORT_DIR = os.getenv("CMA_REPORT_DIR") or os.path.join(tempfile.gettempdir(), "nidus_cma_reports")
+CMA_REPORT_CACHE_MB = float(os.getenv("CMA_REPORT_CACHE_MB", "200"))
+CMA_REPORT_WORKERS = int(os.getenv("CMA_REPORT_WORKERS", "2"))
+CMA_JOB_TIMEOUT = int(os.getenv("CMA_JOB_TIMEOUT", "300"))  # secunde; dupa atat un job "pending" e abandonat
+
+
+def report_key(listing_id: int, comparable_ids: Iterable[int], updated_at) -> str:
+    """Acelasi anunt, aceleasi comparabile, aceeasi versiune -> acelasi PDF (si acelasi job id)."""
+    raw = f"{listing_id}|{','.join(str(i) for i in comparable_ids)}|{updated_at.isoformat() if updated_at else ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:32]
+
+
+class ArtifactStore:
+    """
+    PDF-urile terminate, pe disc, limitate ca dimensiune totala.
+    LRU dupa mtime: fiecare citire "atinge" fisierul, la depasire stergem cele mai vechi.
+    """
+
+    def __init__(self, directory: str = CMA_REPORT_DIR, max_bytes: int = int(CMA_REPORT_CACHE_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str = ".pdf") -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            os.utime(path)  # marcam ca folosit recent
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self._path(key)
+        tmp_path = self._path(key, f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # cititorii vad fie nimic, fie fisierul complet
+        self.evict(keep=path)
+        return path
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pdf"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # sters intre timp de alt worker
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def evict(self, keep: Optional[str] = None):
+        with self._lock:
+            self._drop_stale_marks()
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                path = os.path.join(self.directory, name)
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except OSError:
+                    pass
+                self.unmark(name[:-len(".pdf")], "meta")
+                total -= size
+
+    def _drop_stale_marks(self):
+        # Markere / fisiere .tmp ramase de la joburi vechi sau workeri opriti brusc
+        cutoff = time.time() - CMA_JOB_TIMEOUT
+        for name in os.listdir(self.directory):
+            if name.endswith(".meta"):
+                # Metadatele raman doar cat exista PDF-ul (sau jobul e inca recent)
+                if os.path.exists(self._path(name[:-len(".meta")])):
+                    continue
+            elif not name.endswith((".pending", ".error", ".tmp")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    # --- Markere de stare, vizibile tuturor workerilor ---
+    def mark(self, key: str, state: str, message: str = ""):
+        with open(self._path(key, f".{state}"), "w") as f:
+            f.write(message)
+
+    def unmark(self, key: str, state: str):
+        try:
+            os.remove(self._path(key, f".{state}"))
+        except OSError:
+            pass
+
+    def write_meta(self, key: str, meta: dict):
+        self.mark(key, "meta", json.dumps(meta))
+
+    def read_meta(self, key: str) -> Optional[dict]:
+        """Cine a cerut raportul (owner_id, listing_id); None pentru joburi necunoscute."""
+        mark = self.read_mark(key, "meta")
+        if mark is None:
+            return None
+        try:
+            return json.loads(mark[1])
+        except ValueError:
+            return None
+
+    def read_mark(self, key: str, state: str):
+        """(varsta in secunde, continut) sau None daca markerul nu exista."""
+        path = self._path(key, f".{state}")
+        try:
+            age = time.time() - os.stat(path).st_mtime
+            with open(path) as f:
+                return age, f.read()
+        except OSError:
+            return None
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "directory": self.directory,
+            "items": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class ReportJobs:
+    """Coada de generare a rapoartelor: job id = cheia artefactului, deci cererile repetate nu re-genereaza."""
+
+    def __init__(self, store: ArtifactStore, workers: int = CMA_REPORT_WORKERS):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cma-report")
+        self._lock = threading.Lock()
+
+    def status(self, key: str) -> Optional[dict]:
+        if self.store.get(key):
+            return {"job_id": key, "status": "done"}
+        failed = self.store.read_mark(key, "error")
+        if failed is not None:
+            return {"job_id": key, "status": "failed", "error": failed[1]}
+        pending = self.store.read_mark(key, "pending")
+        if pending is not None:
+            if pending[0] > CMA_JOB_TIMEOUT:
+                return {"job_id": key, "status": "failed", "error": "Timeout"}
+            return {"job_id": key, "status": "pending"}
+        return None
+
+    def owner(self, key: str) -> Optional[str]:
+        meta = self.store.read_meta(key)
+        return meta.get("owner_id") if meta else None
+
+    def submit(self, key: str, render: Callable[[], bytes], meta: dict) -> dict:
+        with self._lock:
+            # Metadatele (proprietarul) raman cat timp exista PDF-ul; le rescriem la fiecare cerere
+            self.store.write_meta(key, meta)
+            current = self.status(key)
+            if current is not None and current["status"] in ("done", "pending"):
+                return current
+            # Job nou (sau reincercare dupa esec / timeout)
+            self.store.unmark(key, "error")
+            self.store.mark(key, "pending")
+        self._executor.submit(self._run, key, render)
+        return {"job_id": key, "status": "pending"}
+
+    def _run(self, key: str, render: Callable[[], bytes]):
+        try:
+            self.store.put(key, render())
+        except Exception as e:
+            print(f"CMA: generarea raportului {key} a esuat: {e}")
+            self.store.mark(key, "error", str(e))
+        finally:
+            self.store.unmark(key, "pending")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+report_store = ArtifactStore()
+report_jobs = ReportJobs(report_store)
@@ -0,0 +1,102 @@
+from statistics import median
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import Float, func, literal, select
+
+from app import models
+from app.utils.search import fuzzy_contains
+
+# Cate comparabile intoarcem si din cati vecini (KNN pe indexul GiST) alegem
+DEFAULT_K = 5
+CANDIDATE_POOL = 200
+
+# Ponderi pentru distanta compusa (scor mic = comparabil mai bun).
+# Fiecare termen e adus la o scara "1 punct ~ o diferenta serioasa".
+WEIGHTS = {
+    "distance_km": 1.0,   # per km
+    "sqm": 2.0,           # |ln(sqm / sqm_tinta)|: 20% diferenta ~ 0.36
+    "rooms": 0.5,         # per camera
+    "floor": 0.1,         # per etaj
+    "year_built": 0.03,   # per an (10 ani ~ 0.3)
+    "age_days": 0.01,     # per zi de la ultima actualizare (30 zile ~ 0.3)
+}
+MISSING_PENALTY = 0.5     # cand comparabilul nu are valoarea respectiva
+
+
+class Comparable(NamedTuple):
+    listing: models.Listing
+    score: float
+    distance_m: Optional[float]
+
+
+def _abs_diff(column, value, weight):
+    return func.coalesce(func.abs(column - value) * weight, MISSING_PENALTY)
+
+
+def find_comparables(db, target: models.Listing, k: int = DEFAULT_K,
+                     pool_size: int = CANDIDATE_POOL) -> List[Comparable]:
+    """
+    Top-k anunturi similare cu target, intr-un singur query:
+      1. pool: cei mai apropiati pool_size vecini activi (ORDER BY geom <-> tinta, servit de idx_listings_geom)
+      2. scor: distanta ponderata (geografie, mp, camere, etaj, an, prospetime), ORDER BY scor LIMIT k
+    """
+    L = models.Listing
+    filters = [
+        L.status == 'ACTIVE',
+        L.transaction_type == (target.transaction_type or "SALE"),
+        L.id != target.id,
+        L.price_eur > 0,
+        L.sqm > 0,
+    ]
+
+    if target.geom is not None:
+        # Subquery necorelat (InitPlan): Postgres il evalueaza o data si face index scan KNN
+        target_geom = select(L.geom).where(L.id == target.id).scalar_subquery()
+        pool = (
+            select(L.id.label("id"), func.ST_DistanceSphere(L.geom, target_geom).label("distance_m"))
+            .where(*filters, L.geom.isnot(None))
+            .order_by(L.geom.op("<->")(target_geom))
+            .limit(pool_size)
+            .subquery("pool")
+        )
+        geo_term = pool.c.distance_m / 1000.0 * WEIGHTS["distance_km"]
+    else:
+        # Fara coordonate: acelasi cartier (fuzzy), cei mai apropiati ca suprafata
+        if target.neighborhood and target.neighborhood.strip():
+            filters.append(fuzzy_contains(L.neighborhood, target.neighborhood))
+        pool_order = func.abs(L.sqm - target.sqm) if target.sqm else L.updated_at.desc()
+        pool = (
+            select(L.id.label("id"), literal(None, Float).label("distance_m"))
+            .where(*filters)
+            .order_by(pool_order)
+            .limit(pool_size)
+            .subquery("pool")
+        )
+        geo_term = literal(MISSING_PENALTY)
+
+    terms = [geo_term]
+    if target.sqm:
+        terms.append(func.abs(func.ln(L.sqm / float(target.sqm))) * WEIGHTS["sqm"])
+    if target.rooms is not None:
+        terms.append(_abs_diff(L.rooms, target.rooms, WEIGHTS["rooms"]))
+    if target.floor is not None:
+        terms.append(_abs_diff(L.floor, target.floor, WEIGHTS["floor"]))
+    if target.year_built:
+        terms.append(_abs_diff(L.year_built, target.year_built, WEIGHTS["year_built"]))
+    age_days = func.extract("epoch", func.now() - L.updated_at) / 86400.0
+    terms.append(func.coalesce(age_days * WEIGHTS["age_days"], MISSING_PENALTY))
+
+    score = sum(terms[1:], terms[0]).label("score")
+    rows = db.execute(
+        select(L, pool.c.distance_m, score)
+        .join(pool, pool.c.id == L.id)
+        .order_by(score, L.id)
+        .limit(k)
+    ).all()
+    return [Comparable(listing, float(row_score), distance_m) for listing, distance_m, row_score in rows]
+
+
+def comparable_price_sqm(comparables: List[Comparable]) -> Optional[float]:
+    """Mediana pretului pe mp a comparabilelor (None daca nu avem niciunul)."""
+    values = [c.listing.price_eur / c.listing.sqm for c in comparables if c.listing.sqm]
+    return median(values) if values else None
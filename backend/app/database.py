@@ -1,14 +1,135 @@
 import os
+import sys
+import threading
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
 # URL
 load_dotenv()
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# --- CONFIGURARE POOL ---
+# Numele procesului apare in pg_stat_activity (application_name), util la debugging.
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME") or (
+    os.path.splitext(os.path.basename(sys.argv[0] or ""))[0] or "nidushomes"
+)
+
+# Scripturile din pipeline fac o singura interogare odata, deci le ajung 1-2 conexiuni.
+# Calcul max_connections in Postgres:
+#   workeri_uvicorn * (DB_POOL_SIZE + DB_MAX_OVERFLOW) * 2 (sync + async)
+#   + nr_scripturi * (DB_WORKER_POOL_SIZE + DB_WORKER_MAX_OVERFLOW)
+PIPELINE_SCRIPTS = {"real_scraper", "enricher", "janitor", "processor_images", "ai_worker", "automation"}
+IS_PIPELINE_SCRIPT = DB_APPLICATION_NAME in PIPELINE_SCRIPTS
+
+if IS_PIPELINE_SCRIPT:
+    DB_POOL_SIZE = int(os.getenv("DB_WORKER_POOL_SIZE", "1"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_WORKER_MAX_OVERFLOW", "1"))
+else:
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # secunde de asteptare dupa o conexiune libera
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # reconectare dupa N secunde (pooler-ul Supabase taie conexiunile vechi)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = fara limita
+
+
+# --- TELEMETRIE POOL ---
+class _WaitTimingMixin:
+    """Masoara cat asteapta un request dupa o conexiune libera din pool."""
+
+    def _do_get(self):
+        stats = self.wait_stats
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with stats["lock"]:
+                stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with stats["lock"]:
+                stats["checkouts"] += 1
+                stats["wait_total"] += waited
+                stats["wait_max"] = max(stats["wait_max"], waited)
+
+    @property
+    def wait_stats(self):
+        stats = self.__dict__.get("_wait_stats")
+        if stats is None:
+            stats = {"lock": threading.Lock(), "checkouts": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+            self.__dict__["_wait_stats"] = stats
+        return stats
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_kwargs():
+    return dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Fabrica unica de engine-uri sync (API + scripturi din pipeline)."""
+    connect_args = {"application_name": DB_APPLICATION_NAME}
+    if DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return create_engine(url, poolclass=InstrumentedQueuePool, connect_args=connect_args, **_pool_kwargs())
+
+
+def make_async_engine(url: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    server_settings = {"application_name": f"{DB_APPLICATION_NAME}-async"}
+    if DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    return create_async_engine(
+        url, poolclass=InstrumentedAsyncQueuePool,
+        connect_args={"server_settings": server_settings}, **_pool_kwargs()
+    )
+
+
+def pool_status(engine_) -> dict:
+    pool = engine_.pool
+    stats = pool.wait_stats if isinstance(pool, _WaitTimingMixin) else None
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "timeout_s": DB_POOL_TIMEOUT,
+    }
+    if stats:
+        with stats["lock"]:
+            checkouts = stats["checkouts"]
+            status.update({
+                "checkouts": checkouts,
+                "timeouts": stats["timeouts"],
+                "wait_avg_ms": round(stats["wait_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_max_ms": round(stats["wait_max"] * 1000, 3),
+            })
+    return status
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -19,4 +140,38 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- ASYNC (asyncpg) ---
+# Folosit doar de rutele fierbinti (async def). Engine-ul e creat la prima cerere,
+# ca scripturile din pipeline (sync) sa nu aiba nevoie de asyncpg instalat.
+def to_async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            url = "postgresql+asyncpg://" + url[len(prefix):]
+            break
+    # asyncpg nu intelege sslmode=..., ci ssl=...
+    return url.replace("sslmode=", "ssl=")
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    to_async_url(SQLALCHEMY_DATABASE_URL) if SQLALCHEMY_DATABASE_URL else None
+)
+
+async_engine = None
+AsyncSessionLocal = None
+
+def get_async_engine():
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        async_engine = make_async_engine(ASYNC_DATABASE_URL)
+        # expire_on_commit=False: obiectele raman citibile dupa commit (fara lazy load in async)
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    return async_engine
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
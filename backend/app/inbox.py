@@ -0,0 +1,47 @@
+from typing import List
+
+from sqlalchemy import case, or_, select, true
+from sqlalchemy.orm import joinedload
+
+from app import models, schemas
+
+
+def inbox_query(user_id: str):
+    """Conversatiile userului cu ultimul mesaj si necititele lui, intr-un singur statement."""
+    # 1. Ultimul mesaj per conversatie (LATERAL ... LIMIT 1 pe ix_messages_conversation_history)
+    last_msg = select(models.Message.content).where(
+        models.Message.conversation_id == models.Conversation.id
+    ).order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(1).lateral("last_msg")
+
+    # 2. Necitite = contorul denormalizat al participantului curent (fara count() pe messages)
+    my_unread = case(
+        (models.Conversation.buyer_id == user_id, models.Conversation.buyer_unread),
+        else_=models.Conversation.seller_unread
+    )
+
+    # 3. Anuntul vine in acelasi JOIN (fara lazy load per conversatie)
+    return (
+        select(models.Conversation, last_msg.c.content, my_unread)
+        .outerjoin(last_msg, true())
+        .options(joinedload(models.Conversation.listing))
+        .filter(or_(models.Conversation.buyer_id == user_id, models.Conversation.seller_id == user_id))
+        .order_by(models.Conversation.updated_at.desc())
+    )
+
+
+async def fetch_inbox(db, user_id: str) -> List[schemas.ConversationOut]:
+    result = await db.execute(inbox_query(user_id))
+
+    results = []
+    for conv, last_content, unread_count in result.all():
+        # Convertim la schema
+        conv_data = schemas.ConversationOut.model_validate(conv)
+
+        # Populam datele extra
+        conv_data.has_unread = (unread_count > 0)
+        conv_data.unread_count = unread_count
+        conv_data.last_message = last_content if last_content is not None else "Începe discutia"
+
+        results.append(conv_data)
+
+    return results
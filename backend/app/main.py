@@ -1,40 +1,47 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, Query, Header
-from pydantic import BaseModel
-from supabase import create_client, Client
+from fastapi import FastAPI, Depends, HTTPException, Path, Query, Request, Response, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import and_, desc, event, func, tuple_, text, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware 
-from sqlalchemy.orm import Session, joinedload
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
 
-from app import models, schemas
-from app.database import engine, get_db
+from app import models, schemas, database
+from app.database import engine, get_db, get_async_db, pool_status
+from app.auth import AuthUser, get_current_user, get_optional_user, verify_token
+from app.profile_cache import get_profiles
 
 from fastapi.responses import FileResponse
 from app.utils.pdf_generator import generate_cma_report
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.etag import make_etag, etag_matches, not_modified
+from app.utils.search import apply_listing_filters, fuzzy_contains, normalize_search_term, unaccent_lower
+from app.tile_cache import tile_cache, TILE_EXTENT, TILE_BUFFER
+from app.valuation import normalize_features, estimate_cache, price_model_store
+from app.view_counter import ViewCounter, is_countable_view, views_clock
+from app.realtime import chat_hub, pg_listener, notify_new_message, notify_read
+from app.query_cache import query_cache, notify_listings_changed, LISTINGS_CHANNEL
+from app.market_stats import NeighborhoodStats, fetch_neighborhood_stats
+from app.comparables import find_comparables
+from app.cma_reports import report_jobs, report_store, report_key
+from app.inbox import fetch_inbox
 
 import tldextract 
 from urllib.parse import urlparse
-import joblib
-import pandas as pd
 
 # Creare tabele
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Ro-Zillow API")
-
-# --- CONFIGURARE SUPABASE ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# orjson pentru toate raspunsurile JSON (listele de anunturi pot avea sute de KB)
+app = FastAPI(title="Ro-Zillow API", default_response_class=ORJSONResponse)
 
 ADMIN_USER_ID = os.getenv("ADMIN_USER_ID")
 
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    print(f"Eroare la initializarea Supabase: {e}")
-
 
 # CONFIGURARE CORS
 app.add_middleware(
@@ -43,140 +50,575 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"], 
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "ETag"],
 )
 
-# 1. Încarcare Model AI la startup
-price_model = None
-model_path = os.path.join("ai", "price_model.joblib")
+# COMPRESIE (doar peste un prag; raspunsurile mici nu merita CPU-ul)
+# Brotli e optional (pip install brotli-asgi) si cade singur pe gzip pentru clientii vechi.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
 
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(
+        BrotliMiddleware, quality=min(COMPRESSION_LEVEL, 11), minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True
+    )
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=COMPRESSION_LEVEL)
+
+# 1. Încarcare Model AI la startup (reincarcat automat la re-antrenare)
+# Sub gunicorn (preload) modelul vine deja incarcat din master si load() nu il mai citeste
 @app.on_event("startup")
 def load_ai_model():
-    global price_model
-    if os.path.exists(model_path):
-        try:
-            price_model = joblib.load(model_path)
-            print("AI Price Model loaded successfully!")
-        except Exception as e:
-            print(f"Could not load AI model: {e}")
-    else:
-        print("No AI model found. Run 'python ai/train_model.py' to create one.")
+    price_model_store.load()
+    price_model_store.start()
+
+@app.on_event("shutdown")
+def stop_ai_model_watch():
+    price_model_store.stop()
+
+# Vizualizarile se aduna in memorie si se scriu in batch (vezi app/view_counter.py)
+view_counter = ViewCounter(engine)
+
+@app.on_event("startup")
+def start_view_counter():
+    view_counter.start()
+
+@app.on_event("shutdown")
+def flush_view_counter():
+    view_counter.stop()
+
+# Fiecare worker asculta NOTIFY: chat in timp real + invalidarea cache-ului de cautari
+# (scrierile din pipeline ajung la toti workerii pe acelasi canal)
+pg_listener.on(LISTINGS_CHANNEL, query_cache.handle_notify)
+pg_listener.on(LISTINGS_CHANNEL, tile_cache.handle_notify)
+
+@app.on_event("startup")
+def check_tile_cache():
+    if not tile_cache.cache_dir:
+        print("Tile cache: fara director pe disc (TILE_CACHE_DIR gol). Invalidarile punctuale din "
+              "pipeline nu ajung la API; tile-urile se golesc doar la NOTIFY listings_changed.")
+
+@app.on_event("startup")
+async def start_pg_listener():
+    pg_listener.start()
+
+@app.on_event("shutdown")
+async def stop_pg_listener():
+    await pg_listener.stop()
+
+@app.on_event("shutdown")
+def stop_report_jobs():
+    report_jobs.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
 
 # 2. Endpoint Estimare Pret
+MAX_BATCH_ESTIMATES = int(os.getenv("MAX_BATCH_ESTIMATES", "1000"))
+
 class ValuationRequest(BaseModel):
     sqm: float
     rooms: int
     floor: int = 1
     year_built: int = 1990
     neighborhood: str
+    # Modelul e antrenat si pe astea; lipsa lor nu mai strica predictia
+    compartmentation: Optional[str] = None
+    condition: Optional[str] = None
+
+    def features(self):
+        return normalize_features(
+            self.sqm, self.rooms, self.floor, self.year_built,
+            self.neighborhood, self.compartmentation, self.condition
+        )
+
+class BatchValuationRequest(BaseModel):
+    properties: List[ValuationRequest] = Field(..., min_length=1, max_length=MAX_BATCH_ESTIMATES)
 
 @app.post("/api/ai/estimate-price")
 def estimate_property_price(data: ValuationRequest):
+    price_model = price_model_store.get()
     if not price_model:
         return {"error": "AI Model not loaded. Train it first."}
     
-    # Pregatim datele exact cum au fost la antrenare
-    input_df = pd.DataFrame([{
-        'sqm': data.sqm,
-        'rooms': data.rooms,
-        'floor': data.floor,
-        'year_built': data.year_built,
-        'neighborhood': data.neighborhood
-    }])
-    
     try:
-        prediction = price_model.predict(input_df)[0]
+        # Memoizat pe tuplul normalizat (aceleasi caracteristici -> fara predict)
+        prediction = estimate_cache.estimate(price_model, data.features())
         return {
-            "estimated_price": int(prediction),
+            "estimated_price": prediction,
             "currency": "EUR",
             "status": "success"
         }
     except Exception as e:
         return {"error": f"Prediction failed: {str(e)}"}
 
+# 2b. Estimare in lot (portofoliul agentului): un singur predict vectorizat
+@app.post("/api/ai/estimate-price/batch")
+def estimate_property_prices_batch(data: BatchValuationRequest):
+    price_model = price_model_store.get()
+    if not price_model:
+        return {"error": "AI Model not loaded. Train it first."}
+
+    try:
+        predictions = estimate_cache.estimate_many(price_model, [p.features() for p in data.properties])
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}
+
+    return {
+        "estimates": [{"estimated_price": price} for price in predictions],
+        "count": len(predictions),
+        "currency": "EUR",
+        "status": "success"
+    }
+
+
+# 2c. Ce model ruleaza acum (versiune = hash-ul fisierului)
+@app.get("/api/ai/model")
+def get_price_model_info():
+    return price_model_store.info()
 
 
+# Proiectia "light" pentru liste (view=summary): doar ce randeaza un card
+SUMMARY_COLUMNS = (
+    models.Listing.id, models.Listing.title, models.Listing.price_eur, models.Listing.sqm,
+    models.Listing.rooms, models.Listing.neighborhood, models.Listing.image_url,
+    models.Listing.transaction_type, models.Listing.source_platform, models.Listing.is_claimed,
+    models.Listing.views, models.Listing.favorites_count, models.Listing.lat, models.Listing.lng,
+    models.Listing.created_at, models.Listing.updated_at,
+)
+
+def with_listing_view(query, view: str):
+    if view == "summary":
+        # Nu citim description / images / ai_tags si nu atingem agent_profile
+        return query.options(load_only(*SUMMARY_COLUMNS))
+    # Un singur SELECT ... IN pentru agenti in loc de unul per anunt
+    return query.options(selectinload(models.Listing.agent_profile))
+
+def serialize_listings(listings, view: str = "full") -> bytes:
+    """Serializare directa prin pydantic-core (fara validarea response_model a FastAPI)."""
+    adapter = schemas.ListingSummaryList if view == "summary" else schemas.ListingOutList
+    items = adapter.validate_python(listings, from_attributes=True)
+    return adapter.dump_json(items, by_alias=True)
+
+def listing_summary_response(listings, headers=None):
+    return Response(
+        content=serialize_listings(listings, "summary"),
+        media_type="application/json",
+        headers=headers
+    )
+
+def invalidate_listing_caches(db: Session):
+    """
+    Se apeleaza inainte de commit, la orice scriere pe anunturi.
+    Ceilalti workeri afla prin NOTIFY, workerul curent imediat dupa commit.
+    """
+    notify_listings_changed(db)
+    event.listen(db, "after_commit", lambda session: query_cache.bump(), once=True)
+
 # 1. GET LISTINGS (Cautare Avansata)
 @app.get("/listings", response_model=List[schemas.ListingOut])
-def get_listings(
-    db: Session = Depends(get_db),
+async def get_listings(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Cursor opac primit in header-ul X-Next-Cursor"),
+    view: str = Query("full", pattern="^(full|summary)$", description="summary = doar campurile pentru carduri"),
     transaction_type: str = Query("SALE", description="SALE sau RENT"),
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_sqm: Optional[float] = None,
     rooms: Optional[int] = None,
-    neighborhood: Optional[str] = None
+    neighborhood: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Cautare libera in cartier si adresa (fara diacritice)")
 ):
-    # Start Query
-    query = db.query(models.Listing).filter(
-        models.Listing.status == 'ACTIVE',
-        models.Listing.transaction_type == transaction_type
-    )
+    if_none_match = request.headers.get("if-none-match")
+
+    # 1. Cache pe tuplul normalizat de filtre (raspunsul e pastrat deja serializat, cu ETag)
+    cache_params = {
+        "view": view, "transaction_type": transaction_type,
+        "min_price": min_price, "max_price": max_price, "min_sqm": min_sqm, "rooms": rooms,
+        "neighborhood": normalize_search_term(neighborhood) if neighborhood else None,
+        "q": normalize_search_term(q) if q else None,
+        "limit": limit, "offset": 0 if cursor else offset, "cursor": cursor,
+    }
+    cache_key = query_cache.make_key("listings", cache_params)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        if etag_matches(if_none_match, cached["etag"]):
+            return not_modified(cached["etag"], cached["headers"])
+        return Response(content=cached["body"], media_type="application/json",
+                        headers={**cached["headers"], "ETag": cached["etag"],
+                                 "Cache-Control": "no-cache", "X-Cache": "HIT"})
+
+    # 2. Start Query + Filtre
+    def filtered(query):
+        return apply_listing_filters(
+            query, transaction_type,
+            min_price=min_price, max_price=max_price, min_sqm=min_sqm,
+            rooms=rooms, neighborhood=neighborhood, q=q
+        )
+
+    query = filtered(with_listing_view(select(models.Listing), view))
 
-    # Filtre
-    if min_price:
-        query = query.filter(models.Listing.price_eur >= min_price)
-    if max_price:
-        query = query.filter(models.Listing.price_eur <= max_price)
-    if min_sqm:
-        query = query.filter(models.Listing.sqm >= min_sqm)
-    if rooms:
-        query = query.filter(models.Listing.rooms >= rooms)
-    if neighborhood:
-        query = query.filter(models.Listing.neighborhood.ilike(f"%{neighborhood}%"))
+    # Paginare keyset: continuam strict dupa ultimul (updated_at, id) vazut.
+    # Fara cursor pastram offset-ul pentru clientii vechi.
+    if cursor:
+        last_updated_at, last_id = decode_cursor(cursor)
+        if last_updated_at is not None:
+            query = query.filter(
+                tuple_(models.Listing.updated_at, models.Listing.id) < tuple_(last_updated_at, last_id)
+            )
+        else:
+            query = query.filter(models.Listing.id < last_id)
+        offset = 0
 
     # Ordonare (cele mai noi primele) si Paginare
-    listings = query.order_by(desc(models.Listing.updated_at)).limit(limit).offset(offset).all()
-    
-    return listings 
+    result = await db.execute(query.order_by(
+        desc(models.Listing.updated_at), desc(models.Listing.id)
+    ).limit(limit).offset(offset))
+    listings = result.scalars().all()
+
+    headers = {}
+    if len(listings) == limit:
+        last = listings[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.updated_at, last.id)
+
+    # 3. ETag din corp (strong), pastrat in cache langa el: hit-urile nu mai ating DB-ul,
+    #    iar dupa o invalidare clientul primeste tot 304 daca pagina lui nu s-a schimbat
+    body = serialize_listings(listings, view)
+    etag = make_etag(cache_key, body)
+    query_cache.put(cache_key, {"body": body.decode(), "headers": headers, "etag": etag})
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    return Response(content=body, media_type="application/json",
+                    headers={**headers, "ETag": etag, "Cache-Control": "no-cache", "X-Cache": "MISS"})
+
+# 1b. HARTA (Viewport + Clustering pe server)
+CLUSTER_MAX_ZOOM = 14      # Pana la acest zoom (inclusiv) trimitem clustere
+CLUSTER_CELLS_PER_TILE = 4 # Cate celule de grid incap pe latimea unui tile 256px
+MAX_MAP_PINS = 1000
+
+@app.get("/listings/map", response_model=schemas.MapResponse)
+def get_map_listings(
+    bbox: str = Query(..., description="minLng,minLat,maxLng,maxLat"),
+    zoom: int = Query(12, ge=0, le=22),
+    transaction_type: str = Query("SALE", description="SALE sau RENT"),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_sqm: Optional[float] = None,
+    rooms: Optional[int] = None,
+    neighborhood: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        min_lng, min_lat, max_lng, max_lat = [float(v) for v in bbox.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox invalid (minLng,minLat,maxLng,maxLat)")
+
+    # Operatorul && pe ST_MakeEnvelope foloseste indexul GiST pe geom
+    envelope = func.ST_MakeEnvelope(min_lng, min_lat, max_lng, max_lat, 4326)
+    lat_expr = models.Listing.lat
+    lng_expr = models.Listing.lng
+
+    def in_viewport(query):
+        query = apply_listing_filters(
+            query, transaction_type,
+            min_price=min_price, max_price=max_price, min_sqm=min_sqm,
+            rooms=rooms, neighborhood=neighborhood
+        )
+        return query.filter(models.Listing.geom.intersects(envelope))
+
+    # Zoom mare: pin-uri individuale
+    if zoom > CLUSTER_MAX_ZOOM:
+        rows = in_viewport(db.query(
+            models.Listing.id,
+            models.Listing.price_eur,
+            models.Listing.rooms,
+            models.Listing.sqm,
+            models.Listing.image_url,
+            lat_expr.label("latitude"),
+            lng_expr.label("longitude"),
+        )).limit(MAX_MAP_PINS + 1).all()
+
+        pins = [schemas.MapPin(**row._mapping) for row in rows[:MAX_MAP_PINS]]
+        return schemas.MapResponse(
+            zoom=zoom, clustered=False, pins=pins, truncated=len(rows) > MAX_MAP_PINS
+        )
+
+    # Zoom mic: agregam pe un grid proportional cu zoom-ul (totul in SQL)
+    cell = 360.0 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+    cell_x = func.floor(lng_expr / cell)
+    cell_y = func.floor(lat_expr / cell)
+    centroid = func.ST_Centroid(func.ST_Collect(models.Listing.geom))
+
+    rows = in_viewport(db.query(
+        func.count(models.Listing.id).label("count"),
+        func.percentile_cont(0.5).within_group(models.Listing.price_eur).label("median_price"),
+        func.ST_Y(centroid).label("latitude"),
+        func.ST_X(centroid).label("longitude"),
+        func.min(models.Listing.id).label("listing_id"),
+    )).group_by(cell_x, cell_y).all()
+
+    clusters = [
+        schemas.MapCluster(
+            latitude=row.latitude,
+            longitude=row.longitude,
+            count=row.count,
+            median_price=row.median_price,
+            listing_id=row.listing_id if row.count == 1 else None,
+        )
+        for row in rows
+    ]
+    return schemas.MapResponse(zoom=zoom, clustered=True, clusters=clusters)
+
+# 1c. VECTOR TILES (Mapbox Vector Tile, binar)
+MVT_QUERY = text("""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS geom,
+               ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => :margin), 4326) AS geom_4326
+    ),
+    mvtgeom AS (
+        SELECT ST_AsMVTGeom(ST_Transform(l.geom, 3857), bounds.geom, :extent, :buffer, true) AS geom,
+               l.id, l.price_eur, l.rooms, l.sqm, l.transaction_type
+        FROM listings l, bounds
+        WHERE l.status = 'ACTIVE'
+          AND l.geom && bounds.geom_4326
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'listings', :extent, 'geom') FROM mvtgeom
+""")
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+def get_listing_tile(z: int, x: int, y: int, db: Session = Depends(get_db)):
+    if z < 0 or z > 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile invalid")
+
+    tile = tile_cache.get(z, x, y)
+    if tile is None:
+        tile = db.execute(MVT_QUERY, {
+            "z": z, "x": x, "y": y,
+            "extent": TILE_EXTENT, "buffer": TILE_BUFFER,
+            "margin": TILE_BUFFER / TILE_EXTENT,
+        }).scalar()
+        tile = bytes(tile) if tile else b""
+        tile_cache.put(z, x, y, tile)
+
+    return Response(
+        content=tile,
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"Cache-Control": "public, max-age=60"}
+    )
+
+# 1d. FACETE (numaratori pentru FilterBar, intr-un singur query)
+PRICE_HISTOGRAM_BUCKETS = 10
+MAX_NEIGHBORHOOD_FACETS = 50
+
+# GROUPING(nb, rooms, transaction_type, bucket): bitul e 1 pentru coloanele care NU sunt grupate
+FACET_NEIGHBORHOOD = 0b0111
+FACET_ROOMS = 0b1011
+FACET_TRANSACTION_TYPE = 0b1101
+FACET_PRICE = 0b1110
+
+@app.get("/listings/facets", response_model=schemas.FacetsResponse)
+async def get_listing_facets(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    transaction_type: str = Query("SALE", description="SALE sau RENT"),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_sqm: Optional[float] = None,
+    rooms: Optional[int] = None,
+    neighborhood: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Cautare libera in cartier si adresa (fara diacritice)")
+):
+    if_none_match = request.headers.get("if-none-match")
+
+    # 1. Acelasi cache (si aceeasi invalidare) ca rezultatele cautarii
+    cache_params = {
+        "transaction_type": transaction_type,
+        "min_price": min_price, "max_price": max_price, "min_sqm": min_sqm, "rooms": rooms,
+        "neighborhood": normalize_search_term(neighborhood) if neighborhood else None,
+        "q": normalize_search_term(q) if q else None,
+    }
+    cache_key = query_cache.make_key("facets", cache_params)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        if etag_matches(if_none_match, cached["etag"]):
+            return not_modified(cached["etag"])
+        return Response(content=cached["body"], media_type="application/json",
+                        headers={"ETag": cached["etag"], "Cache-Control": "no-cache", "X-Cache": "HIT"})
+
+    # 2. Fatete "disjunctive": fiecare fateta ignora propriul filtru (ca optiunile alternative
+    #    sa aiba numere reale). In WHERE raman doar filtrele fara fateta (status, mp, q);
+    #    tip, camere, cartier si pret devin flag-uri aplicate prin count(*) FILTER.
+    L = models.Listing
+    price_ok = and_(
+        L.price_eur >= min_price if min_price else true(),
+        L.price_eur <= max_price if max_price else true(),
+    )
+    base = apply_listing_filters(
+        select(
+            L.neighborhood,
+            unaccent_lower(L.neighborhood).label("nb"),
+            L.rooms,
+            L.transaction_type,
+            L.price_eur,
+            (L.transaction_type == transaction_type).label("type_ok"),
+            func.coalesce(L.rooms >= rooms if rooms else true(), False).label("rooms_ok"),
+            price_ok.label("price_ok"),
+            func.coalesce(
+                fuzzy_contains(L.neighborhood, neighborhood) if neighborhood and neighborhood.strip() else true(),
+                False
+            ).label("nb_ok"),
+        ),
+        None, min_sqm=min_sqm, q=q
+    ).cte("base")
+    c = base.c
+
+    # Histograma: tot in afara de filtrul de pret, pe intervalul real al preturilor (width_bucket: 1..N)
+    for_price = and_(c.type_ok, c.rooms_ok, c.nb_ok)
+    bounds = select(
+        func.min(c.price_eur).filter(for_price).label("lo"),
+        func.max(c.price_eur).filter(for_price).label("hi"),
+    ).cte("bounds")
+    binned = select(
+        *base.c, bounds.c.lo, bounds.c.hi,
+        func.width_bucket(c.price_eur, bounds.c.lo, bounds.c.hi + 1, PRICE_HISTOGRAM_BUCKETS).label("bucket"),
+    ).select_from(base.join(bounds, true())).cte("binned")
+
+    b = binned.c
+    rows = (await db.execute(
+        select(
+            func.grouping(b.nb, b.rooms, b.transaction_type, b.bucket).label("facet"),
+            b.nb, b.rooms, b.transaction_type, b.bucket,
+            func.max(b.neighborhood).label("label"),
+            func.max(b.lo).label("lo"),
+            func.max(b.hi).label("hi"),
+            func.count().filter(and_(b.type_ok, b.rooms_ok, b.price_ok)).label("count_for_nb"),
+            func.count().filter(and_(b.type_ok, b.price_ok, b.nb_ok)).label("count_for_rooms"),
+            func.count().filter(and_(b.rooms_ok, b.price_ok, b.nb_ok)).label("count_for_type"),
+            func.count().filter(and_(b.type_ok, b.rooms_ok, b.nb_ok)).label("count_for_price"),
+        ).group_by(func.grouping_sets(b.nb, b.rooms, b.transaction_type, b.bucket))
+    )).all()
+
+    # 3. Impartim randurile pe fatete
+    neighborhoods, room_counts, types, buckets = [], [], [], {}
+    lo = hi = None
+    for row in rows:
+        if row.facet == FACET_NEIGHBORHOOD and row.nb and row.count_for_nb:
+            neighborhoods.append(schemas.FacetCount(value=row.nb, label=row.label, count=row.count_for_nb))
+        elif row.facet == FACET_ROOMS and row.rooms is not None and row.count_for_rooms:
+            room_counts.append(schemas.FacetCount(value=row.rooms, count=row.count_for_rooms))
+        elif row.facet == FACET_TRANSACTION_TYPE and row.transaction_type:
+            types.append(schemas.FacetCount(value=row.transaction_type, count=row.count_for_type))
+        elif row.facet == FACET_PRICE and row.bucket is not None and row.count_for_price:
+            buckets[row.bucket] = row.count_for_price
+            lo, hi = row.lo, row.hi
+
+    neighborhoods.sort(key=lambda f: f.count, reverse=True)
+    room_counts.sort(key=lambda f: f.value)
+    types.sort(key=lambda f: f.value)
+
+    histogram = []
+    if lo is not None:
+        width = (hi + 1 - lo) / PRICE_HISTOGRAM_BUCKETS
+        histogram = [
+            schemas.PriceBucket(
+                min_price=round(lo + (i - 1) * width, 2),
+                max_price=round(lo + i * width, 2),
+                count=buckets.get(i, 0),
+            )
+            for i in range(1, PRICE_HISTOGRAM_BUCKETS + 1)
+        ]
+
+    body = schemas.FacetsResponse(
+        transaction_type=transaction_type,
+        total=next((f.count for f in types if f.value == transaction_type), 0),
+        neighborhoods=neighborhoods[:MAX_NEIGHBORHOOD_FACETS],
+        rooms=room_counts,
+        transaction_types=types,
+        price_histogram=histogram,
+    ).model_dump_json().encode()
+
+    # ETag din continut: raspunsul e mic, iar la 304 economisim doar transferul
+    etag = make_etag(cache_key, body)
+    query_cache.put(cache_key, {"body": body.decode(), "headers": {}, "etag": etag})
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache", "X-Cache": "MISS"})
+
+# 1e. STATISTICI DE PIATA PE CARTIER (view materializat, reimprospatat de pipeline)
+@app.get("/stats/neighborhoods", response_model=List[schemas.NeighborhoodStatsOut])
+def get_neighborhood_stats(
+    transaction_type: Optional[str] = Query(None, description="SALE, RENT sau ambele"),
+    db: Session = Depends(get_db)
+):
+    cache_key = query_cache.make_key("stats", {"transaction_type": transaction_type})
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached["body"], media_type="application/json", headers={"X-Cache": "HIT"})
+
+    rows = fetch_neighborhood_stats(db)
+    if transaction_type:
+        rows = [row for row in rows if row["transaction_type"] == transaction_type]
+
+    body = schemas.NeighborhoodStatsList.dump_json(schemas.NeighborhoodStatsList.validate_python(rows))
+    query_cache.put(cache_key, {"body": body.decode(), "headers": {}})
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
 
 # 2. GET SINGLE LISTING (Detalii)
 @app.get("/listings/{listing_id}", response_model=schemas.ListingOut)
-def get_listing_detail(
+async def get_listing_detail(
     listing_id: int, 
+    request: Request,
     increment_view: bool = True,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
     ):
     
-    listing = db.query(models.Listing).options(
+    result = await db.execute(select(models.Listing).options(
         joinedload(models.Listing.agent_profile)
-    ).filter(models.Listing.id == listing_id).first()
+    ).filter(models.Listing.id == listing_id))
+    listing = result.scalars().first()
 
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
     
-    if increment_view:
-        if listing.views is None:
-            listing.views = 0
-        listing.views += 1
+    # Doar citire: vizualizarea ajunge in DB la urmatorul flush al contorului
+    # (si se numara si cand raspundem cu 304)
+    if increment_view and is_countable_view(request.headers):
+        view_counter.record(listing_id)
+
+    # ETag din versiunea randului, contoarele scrise fara updated_at (favorite, views)
+    # si datele publice ale agentului: tot ce apare in corp
+    agent = listing.agent_profile
+    etag = make_etag(
+        "listing", listing.id, listing.updated_at, listing.favorites_count, listing.views,
+        (agent.agency_name, agent.phone_number, agent.logo_url, agent.is_verified, agent.rating) if agent else None
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
 
-    db.commit()         
-    db.refresh(listing)
-    
-    return listing
+    return Response(
+        content=schemas.ListingOut.model_validate(listing).model_dump_json(by_alias=True),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
 
 # 3. CREATE LISTING 
 @app.post("/listings", response_model=schemas.ListingOut, status_code=201)
 def create_listing(
     listing: schemas.ListingCreate, 
-    authorization: str = Header(None), 
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # 1. Validare User
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Token")
-    
-    try:
-        token = authorization.split(" ")[1]
-        auth_response = supabase.auth.get_user(token)
-        current_user = auth_response.user
-        # FIX: Convertim ID-ul in string simplu
-        user_id = str(current_user.id)
-        user_phone = current_user.user_metadata.get('phone', None)
-    except Exception as e:
-        print(f"Auth Error: {e}")
-        raise HTTPException(status_code=401, detail="Invalid Token")
+    # 1. Userul vine validat din dependinta (JWT verificat local)
+    user_id = current_user.id
+    user_phone = current_user.user_metadata.get('phone', None)
 
     # 2. Convertim coordonatele
     geom_point = f'POINT({listing.longitude} {listing.latitude})'
@@ -210,48 +652,41 @@ def create_listing(
 
     
     db.add(new_listing)
+    invalidate_listing_caches(db)
     db.commit()
     db.refresh(new_listing)
 
+    tile_cache.invalidate_point(listing.longitude, listing.latitude)
+
     return new_listing
 
 
 # 4. GET MY LISTINGS (Doar anunturile userului logat)
 @app.get("/my-listings", response_model=List[schemas.ListingOut])
 def get_my_listings(
-    authorization: str = Header(None), 
+    current_user: AuthUser = Depends(get_current_user),
+    view: str = Query("full", pattern="^(full|summary)$", description="summary = doar campurile pentru carduri"),
     db: Session = Depends(get_db)
 ):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Token")
-    
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid Token")
+    user_id = current_user.id
 
     # Returnam doar anunturile unde owner_id este egal cu ID-ul userului
-    listings = db.query(models.Listing).filter(models.Listing.owner_id == user_id).all()
+    listings = with_listing_view(db.query(models.Listing), view).filter(
+        models.Listing.owner_id == user_id
+    ).all()
+
+    if view == "summary":
+        return listing_summary_response(listings)
     return listings
 
 # 5. DELETE LISTING (sterge un anunt)
 @app.delete("/listings/{listing_id}", status_code=204)
 def delete_listing(
     listing_id: int,
-    authorization: str = Header(None), 
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Token")
-
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-    except:
-        raise HTTPException(status_code=401, detail="Invalid Token")
+    user_id = current_user.id
 
     # Cautam anuntul
     listing = db.query(models.Listing).filter(models.Listing.id == listing_id).first()
@@ -263,7 +698,9 @@ def delete_listing(
     if listing.owner_id != user_id:
         raise HTTPException(status_code=403, detail="Nu ai permisiunea sa stergi acest anunt")
 
+    tile_cache.invalidate_listing(listing)
     db.delete(listing)
+    invalidate_listing_caches(db)
     db.commit()
     return None
 
@@ -273,18 +710,11 @@ def delete_listing(
 def update_listing(
     listing_id: int,
     listing_update: schemas.ListingCreate,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # 1. Autentificare
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Token")
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-    except:
-        raise HTTPException(status_code=401, detail="Invalid Token")
+    user_id = current_user.id
 
     # 2. Cautam anuntul
     db_listing = db.query(models.Listing).filter(models.Listing.id == listing_id).first()
@@ -305,6 +735,9 @@ def update_listing(
         raise HTTPException(status_code=403, detail="Nu ai voie sa modifici acest anunt")
     # ---------------------------------------
 
+    # Pozitia veche dispare din tile-uri (pin-ul se poate muta)
+    tile_cache.invalidate_listing(db_listing)
+
     # 4. Actualizam câmpurile
     db_listing.title = listing_update.title
     db_listing.description = listing_update.description
@@ -328,114 +761,100 @@ def update_listing(
          db_listing.images = listing_update.images
          db_listing.image_url = listing_update.images[0]
 
+    invalidate_listing_caches(db)
     db.commit()
     db.refresh(db_listing)
+
+    tile_cache.invalidate_point(listing_update.longitude, listing_update.latitude)
     return db_listing
 
 # 7. TOGGLE FAVORITE (Save / Unsave)
+# removed/added se exclud reciproc; ON CONFLICT acopera doua "save" simultane
+TOGGLE_FAVORITE_SQL = text("""
+    WITH target AS (
+        SELECT id FROM listings WHERE id = :listing_id
+    ),
+    removed AS (
+        DELETE FROM favorites
+        WHERE user_id = CAST(:user_id AS uuid) AND listing_id = :listing_id
+        RETURNING listing_id
+    ),
+    added AS (
+        INSERT INTO favorites (user_id, listing_id)
+        SELECT CAST(:user_id AS uuid), id FROM target
+        WHERE NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT (user_id, listing_id) DO NOTHING
+        RETURNING listing_id
+    ),
+    counter AS (
+        UPDATE listings
+        SET favorites_count = GREATEST(
+            COALESCE(favorites_count, 0)
+            + (SELECT count(*) FROM added)
+            - (SELECT count(*) FROM removed), 0)
+        WHERE id = :listing_id
+        RETURNING favorites_count
+    )
+    SELECT
+        EXISTS (SELECT 1 FROM target) AS listing_exists,
+        EXISTS (SELECT 1 FROM added) OR (
+            NOT EXISTS (SELECT 1 FROM removed) AND NOT EXISTS (SELECT 1 FROM added)
+        ) AS is_favorited,
+        (SELECT favorites_count FROM counter) AS favorites_count
+""")
+
 @app.post("/listings/{listing_id}/favorite")
 def toggle_favorite(
     listing_id: int,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # 1. Auth Check
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Trebuie sa fii logat.")
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-    except:
-        raise HTTPException(status_code=401, detail="Token invalid.")
+    user_id = current_user.id
+
+    # 2. Un singur statement: stergem daca exista, altfel inseram,
+    #    iar contorul se actualizeaza in acelasi snapshot (fara lost updates)
+    row = db.execute(TOGGLE_FAVORITE_SQL, {"user_id": user_id, "listing_id": listing_id}).first()
+    if row.listing_exists:
+        # favorites_count e parte din raspunsurile /listings deja cache-uite
+        invalidate_listing_caches(db)
+    db.commit()
 
-    # 2. Cautam anuntul
-    listing = db.query(models.Listing).filter(models.Listing.id == listing_id).first()
-    if not listing:
+    if not row.listing_exists:
         raise HTTPException(status_code=404, detail="Anuntul nu exista.")
 
-    # 3. Verificam in tabelul tau 'favorites'
-    existing_fav = db.query(models.Favorite).filter(
-        models.Favorite.user_id == user_id,
-        models.Favorite.listing_id == listing_id
-    ).first()
-
-    if existing_fav:
-        # --- CAZUL 1: E deja salvat -> IL STERGEM (UNSAVE) ---
-        db.delete(existing_fav)
-        
-        # Decrementam contorul
-        if listing.favorites_count and listing.favorites_count > 0:
-            listing.favorites_count -= 1
-        
-        message = "Removed from favorites"
-        is_favorited = False
-    else:
-        # --- CAZUL 2: Nu e salvat -> IL ADAUGAM (SAVE) ---
-        # Aici folosim structura ta (id se autogenereaza)
-        new_fav = models.Favorite(
-            user_id=user_id, 
-            listing_id=listing_id
-        )
-        db.add(new_fav)
-        
-        # Incrementam contorul
-        if listing.favorites_count is None:
-            listing.favorites_count = 0
-        listing.favorites_count += 1
-        
-        message = "Added to favorites"
-        is_favorited = True
-
-    db.commit()
-    db.refresh(listing)
-
     return {
-        "message": message,
-        "favorites_count": listing.favorites_count,
-        "is_favorited": is_favorited
+        "message": "Added to favorites" if row.is_favorited else "Removed from favorites",
+        "favorites_count": row.favorites_count,
+        "is_favorited": row.is_favorited
     }
 
 # 8. CHECK FAVORITE STATUS
 @app.get("/listings/{listing_id}/is_favorited")
 def check_favorite(
     listing_id: int,
-    authorization: str = Header(None),
+    current_user: Optional[AuthUser] = Depends(get_optional_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization:
+    if not current_user:
         return {"is_favorited": False}
     
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-        
-        fav = db.query(models.Favorite).filter(
-            models.Favorite.user_id == user_id,
-            models.Favorite.listing_id == listing_id
-        ).first()
-        
-        return {"is_favorited": fav is not None}
-    except:
-        return {"is_favorited": False}
+    fav = db.query(models.Favorite).filter(
+        models.Favorite.user_id == current_user.id,
+        models.Favorite.listing_id == listing_id
+    ).first()
+    
+    return {"is_favorited": fav is not None}
     
 # 9. RESET VIEWS (Doar pentru proprietar)
 @app.put("/listings/{listing_id}/reset-views")
 def reset_listing_views(
     listing_id: int,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # 1. Auth Check
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing Token")
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-    except:
-        raise HTTPException(status_code=401, detail="Invalid Token")
+    user_id = current_user.id
 
     # 2. Gasim anuntul
     listing = db.query(models.Listing).filter(models.Listing.id == listing_id).first()
@@ -450,8 +869,10 @@ def reset_listing_views(
     if normalize_id(listing.owner_id) != normalize_id(user_id):
         raise HTTPException(status_code=403, detail="Nu ai voie sa resetezi vizualizarile acestui anunt")
 
-    # 4. Resetam vizualizarile
+    # 4. Resetam vizualizarile (inclusiv cele inca nescrise din buffer-ele tuturor workerilor)
+    view_counter.discard(listing_id)
     listing.views = 0
+    listing.views_reset_at = views_clock()
     db.commit()
     db.refresh(listing)
 
@@ -463,18 +884,10 @@ def reset_listing_views(
 def submit_claim(
     listing_id: int,
     claim_data: schemas.ClaimRequestCreate,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Trebuie sa fii logat.")
-    
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-    except:
-        raise HTTPException(status_code=401, detail="Token invalid.")
+    user_id = current_user.id
 
     # Verificam anuntul
     listing = db.query(models.Listing).filter(models.Listing.id == listing_id).first()
@@ -507,23 +920,12 @@ def submit_claim(
 # 11. VEZI CERERI PENDING (Admin Panel)
 @app.get("/admin/claims", response_model=List[schemas.ClaimRequestOut])
 def get_pending_claims(
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    
     # SECURITATE ADMIN
-    try:
-        token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
-        user_id = str(user.user.id)
-        
-        # Verificam daca esti TU
-        if user_id != ADMIN_USER_ID:
-            raise HTTPException(status_code=403, detail="Acces interzis. Nu esti administrator.")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Token invalid")
+    if current_user.id != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail="Acces interzis. Nu esti administrator.")
         
     claims = db.query(models.ClaimRequest).filter(models.ClaimRequest.status == 'PENDING').all()
     return claims
@@ -532,15 +934,11 @@ def get_pending_claims(
 @app.post("/admin/claims/{claim_id}/approve")
 def approve_claim(
     claim_id: int,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-
     # SECURITATE ADMIN
-    token = authorization.split(" ")[1]
-    requesting_user_id = str(supabase.auth.get_user(token).user.id)
-    if requesting_user_id != ADMIN_USER_ID:
+    if current_user.id != ADMIN_USER_ID:
         raise HTTPException(status_code=403, detail="Acces interzis.")
 
     claim = db.query(models.ClaimRequest).filter(models.ClaimRequest.id == claim_id).first()
@@ -554,6 +952,7 @@ def approve_claim(
     listing.source_platform = "NidusHomes"
     claim.status = "APPROVED"
     
+    invalidate_listing_caches(db)
     db.commit()
     return {"message": "Aprobat cu succes!"}
 
@@ -561,15 +960,11 @@ def approve_claim(
 @app.post("/admin/claims/{claim_id}/reject")
 def reject_claim(
     claim_id: int,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-
     # SECURITATE ADMIN
-    token = authorization.split(" ")[1]
-    requesting_user_id = str(supabase.auth.get_user(token).user.id)
-    if requesting_user_id != ADMIN_USER_ID:
+    if current_user.id != ADMIN_USER_ID:
         raise HTTPException(status_code=403, detail="Acces interzis.")
 
     claim = db.query(models.ClaimRequest).filter(models.ClaimRequest.id == claim_id).first()
@@ -579,26 +974,49 @@ def reject_claim(
     db.commit()
     return {"message": "Cerere respinsa."}
 
+# 13b. TELEMETRIE POOL CONEXIUNI (Admin)
+@app.get("/admin/db-pool")
+def get_db_pool_status(current_user: AuthUser = Depends(get_current_user)):
+    if current_user.id != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail="Acces interzis.")
+
+    return {
+        "application_name": database.DB_APPLICATION_NAME,
+        "sync": pool_status(engine),
+        "async": pool_status(database.async_engine.sync_engine) if database.async_engine else None,
+    }
+
+
+
+# 13c. METRICI CACHE CAUTARI (Admin)
+@app.get("/admin/query-cache")
+def get_query_cache_stats(current_user: AuthUser = Depends(get_current_user)):
+    if current_user.id != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail="Acces interzis.")
+
+    return query_cache.stats()
 
 
 # ZONA CHAT
 
+def bump_unread(conversation: models.Conversation, sender_id: str):
+    """Creste contorul destinatarului; expresie SQL (col + 1), deci fara lost updates."""
+    is_buyer = str(conversation.buyer_id) == sender_id
+    is_seller = str(conversation.seller_id) == sender_id
+    if is_buyer and not is_seller:
+        conversation.seller_unread = models.Conversation.seller_unread + 1
+    elif is_seller and not is_buyer:
+        conversation.buyer_unread = models.Conversation.buyer_unread + 1
+
 # 14. TRIMITE MESAJ (Initiaza conversatie daca nu exista)
 @app.post("/chat/send", response_model=schemas.MessageOut)
 def send_message(
     msg_data: schemas.MessageCreate,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    
     # 1. Cine trimite?
-    try:
-        token = authorization.split(" ")[1]
-        sender = supabase.auth.get_user(token)
-        sender_id = str(sender.user.id)
-    except:
-        raise HTTPException(401, detail="Token invalid")
+    sender_id = current_user.id
 
     # 2. Gasim anuntul ca sa vedem cine e proprietarul (Seller)
     listing = db.query(models.Listing).filter(models.Listing.id == msg_data.listing_id).first()
@@ -644,6 +1062,11 @@ def send_message(
     
     # Actualizam data conversatiei (ca sa apara prima in lista)
     conversation.updated_at = func.now()
+    bump_unread(conversation, sender_id)
+    db.flush()
+
+    # Push catre participanti (livrat la commit)
+    notify_new_message(db, new_message.id)
     
     db.commit()
     db.refresh(new_message)
@@ -652,66 +1075,29 @@ def send_message(
 
 # 15. LISTA CONVERSATII (Inbox-ul meu)
 @app.get("/chat/conversations", response_model=List[schemas.ConversationOut])
-def get_my_conversations(
-    authorization: str = Header(None),
-    db: Session = Depends(get_db)
+async def get_my_conversations(
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if not authorization: raise HTTPException(401)
-    
-    try:
-        token = authorization.split(" ")[1]
-        user_auth = supabase.auth.get_user(token)
-        user_id = str(user_auth.user.id)
-    except:
-        raise HTTPException(401, detail="Token invalid")
-
-    # 1. Luam conversatiile
-    conversations = db.query(models.Conversation).options(
-        joinedload(models.Conversation.listing)
-    ).filter(
-        or_(models.Conversation.buyer_id == user_id, models.Conversation.seller_id == user_id)
-    ).order_by(models.Conversation.updated_at.desc()).all()
-
-    results = []
-    
-    # 2. Pentru fiecare, calculam daca are mesaje necitite
-    for conv in conversations:
-        # Numaram mesajele unde: conversatia e asta, NU sunt eu expeditorul, și is_read e False
-        unread_count = db.query(models.Message).filter(
-            models.Message.conversation_id == conv.id,
-            models.Message.sender_id != user_id, 
-            models.Message.is_read == False
-        ).count()
-
-        # Luam ultimul mesaj pentru preview
-        last_msg = db.query(models.Message).filter(
-            models.Message.conversation_id == conv.id
-        ).order_by(desc(models.Message.created_at)).first()
-
-        # Convertim la schema
-        conv_data = schemas.ConversationOut.model_validate(conv)
-        
-        # Populam datele extra
-        conv_data.has_unread = (unread_count > 0)
-        conv_data.unread_count = unread_count
-        conv_data.last_message = last_msg.content if last_msg else "Începe discutia"
-
-        results.append(conv_data)
-
-    return results
+    # Un singur statement, indiferent cate conversatii are userul (vezi app/inbox.py)
+    return await fetch_inbox(db, current_user.id)
 
 # 16. VEZI MESAJELE DINTR-O CONVERSATIE
+MESSAGES_PAGE_SIZE = 50
+MAX_MESSAGES_PAGE_SIZE = 200
+
 @app.get("/chat/conversations/{conversation_id}/messages", response_model=List[schemas.MessageOut])
 def get_messages(
     conversation_id: int,
-    authorization: str = Header(None),
+    response: Response,
+    before: Optional[str] = Query(None, description="Mesajele mai vechi decat cursorul din X-Prev-Cursor"),
+    after: Optional[str] = Query(None, description="Mesajele mai noi decat cursorul din X-Next-Cursor"),
+    limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=MAX_MESSAGES_PAGE_SIZE),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    
     # Securitate: Verificam daca faci parte din conversatie!
-    token = authorization.split(" ")[1]
-    user_id = str(supabase.auth.get_user(token).user.id)
+    user_id = current_user.id
 
     conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).first()
     if not conversation:
@@ -720,15 +1106,41 @@ def get_messages(
     if str(conversation.buyer_id) != user_id and str(conversation.seller_id) != user_id:
         raise HTTPException(403, detail="Nu ai acces la aceasta conversatie.")
 
-    # print(f"DEBUG:")
-    # print(f"EU (Cel logat):   {user_id}")
-    # print(f"Cumparator Conv:  {conversation.buyer_id}")
-    # print(f"Vanzator Conv:    {conversation.seller_id}")
-
-
-    messages = db.query(models.Message).filter(
-        models.Message.conversation_id == conversation_id
-    ).order_by(models.Message.created_at.asc()).all()
+    if before and after:
+        raise HTTPException(400, detail="Foloseste doar unul dintre 'before' si 'after'")
+
+    # Paginare keyset pe (created_at, id), servita de ix_messages_conversation_history.
+    # Fara cursor intoarcem doar coada conversatiei (ultimele `limit` mesaje).
+    query = db.query(models.Message).filter(models.Message.conversation_id == conversation_id)
+    key = tuple_(models.Message.created_at, models.Message.id)
+
+    def keyset(cursor, newer: bool):
+        ts, msg_id = decode_cursor(cursor)
+        if ts is None:
+            return models.Message.id > msg_id if newer else models.Message.id < msg_id
+        return key > tuple_(ts, msg_id) if newer else key < tuple_(ts, msg_id)
+
+    if after:
+        messages = query.filter(keyset(after, newer=True)).order_by(
+            models.Message.created_at.asc(), models.Message.id.asc()
+        ).limit(limit + 1).all()
+        has_older = False
+        messages = messages[:limit]
+    else:
+        if before:
+            query = query.filter(keyset(before, newer=False))
+        messages = query.order_by(
+            models.Message.created_at.desc(), models.Message.id.desc()
+        ).limit(limit + 1).all()
+        has_older = len(messages) > limit
+        # Citim de la coada spre inceput, dar clientul primeste ordinea cronologica
+        messages = list(reversed(messages[:limit]))
+
+    # X-Prev-Cursor: exista mesaje mai vechi; X-Next-Cursor: de aici se cer cele noi (after=)
+    if messages:
+        if has_older:
+            response.headers["X-Prev-Cursor"] = encode_cursor(messages[0].created_at, messages[0].id)
+        response.headers["X-Next-Cursor"] = encode_cursor(messages[-1].created_at, messages[-1].id)
 
     return messages
 
@@ -736,12 +1148,10 @@ def get_messages(
 @app.get("/chat/conversations/{conversation_id}", response_model=schemas.ConversationOut)
 def get_conversation_details(
     conversation_id: int,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    token = authorization.split(" ")[1]
-    user_id = str(supabase.auth.get_user(token).user.id)
+    user_id = current_user.id
 
     # Aducem conversatia + listing-ul
     conversation = db.query(models.Conversation).options(
@@ -766,18 +1176,11 @@ class ReplyRequest(BaseModel):
 def reply_to_conversation(
     conversation_id: int,
     reply: ReplyRequest,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    
     # 1. Cine trimite?
-    try:
-        token = authorization.split(" ")[1]
-        sender = supabase.auth.get_user(token)
-        sender_id = str(sender.user.id)
-    except:
-        raise HTTPException(401, detail="Token invalid")
+    sender_id = current_user.id
 
     # 2. Verificam conversatia
     conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).first()
@@ -798,6 +1201,11 @@ def reply_to_conversation(
     
     # Actualizam timestamp-ul conversatiei
     conversation.updated_at = func.now()
+    bump_unread(conversation, sender_id)
+    db.flush()
+
+    # Push catre participanti (livrat la commit)
+    notify_new_message(db, new_message.id)
     
     db.commit()
     db.refresh(new_message)
@@ -805,73 +1213,137 @@ def reply_to_conversation(
     return new_message
 
 
+# 19. CANAL REALTIME (mesaje noi + contoare de necitite)
+# Browserul nu poate trimite header Authorization pe WebSocket, deci tokenul vine in query
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket, token: str = Query(...)):
+    try:
+        user = await run_in_threadpool(verify_token, token)
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
+
+    await websocket.accept()
+    chat_hub.connect(user.id, websocket)
+    try:
+        while True:
+            # Clientul nu trimite nimic util; citim doar ca sa detectam deconectarea (si ping-uri)
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_hub.disconnect(user.id, websocket)
+
+
 # AGENTS
 
-# 1. GENERARE RAPORT CMA (PDF)
+# 1. GENERARE RAPORT CMA (PDF, in fundal)
+CMA_COMPARABLES = 5
+
+def render_cma_report(listing_id: int, comparable_ids: List[int]) -> bytes:
+    """Ruleaza pe un thread din report_jobs, cu propria sesiune (cea din request e deja inchisa)."""
+    db = database.SessionLocal()
+    try:
+        # Valoarea estimata vine din mediana precalculata a cartierului (neighborhood_stats);
+        # fara view, raportul foloseste media comparabilelor. Se citeste primul: rollback-ul
+        # din load_or_empty ar expira anunturile deja incarcate.
+        stats = NeighborhoodStats.load_or_empty(db)
+        target = db.get(models.Listing, listing_id)
+        if target is None:
+            raise ValueError("Listing not found")
+        by_id = {
+            listing.id: listing
+            for listing in db.query(models.Listing).filter(models.Listing.id.in_(comparable_ids)).all()
+        } if comparable_ids else {}
+        comparables = [by_id[i] for i in comparable_ids if i in by_id]
+        market = stats.lookup(target.neighborhood, target.transaction_type or "SALE")
+    finally:
+        db.close()
+
+    # Descarcarea imaginilor si desenarea nu mai tin o conexiune din pool
+    return generate_cma_report(target, comparables, market)
+
+def cma_job_response(job: dict):
+    if job["status"] == "done":
+        job = {**job, "pdf_url": f"/agent/cma-jobs/{job['job_id']}/pdf"}
+    return ORJSONResponse(job, status_code=202 if job["status"] == "pending" else 200)
+
+def check_cma_job_access(job_id: str, current_user: AuthUser):
+    # Job id-ul e un hash determinist: accesul vine din proprietar, nu din secretul id-ului
+    owner_id = report_jobs.owner(job_id)
+    if owner_id is None:
+        raise HTTPException(404, detail="Job necunoscut")
+    if owner_id != current_user.id and current_user.id != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail="Nu ai acces la acest raport.")
+
 @app.post("/agent/generate-cma/{listing_id}")
 def create_cma_pdf(
     listing_id: int, 
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # 1. Gasim casa TA
     target = db.query(models.Listing).filter(models.Listing.id == listing_id).first()
     if not target: raise HTTPException(404, detail="Listing not found")
+    if target.owner_id != current_user.id and current_user.id != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail="Poti genera rapoarte doar pentru anunturile tale.")
+
+    # 2. Comparabile: cei mai apropiati vecini (KNN pe geom), ordonati dupa distanta
+    #    ponderata pe suprafata, camere, etaj, an si prospetime (vezi app/comparables.py)
+    comparable_ids = [c.listing.id for c in find_comparables(db, target, k=CMA_COMPARABLES)]
     
-    # --- FIX: EXTRAGERE DATE SAFE (cu getattr) ---
-    t_price = getattr(target, 'price_eur', 0)
-    t_surface = getattr(target, 'sqm', 0) 
-    t_rooms = getattr(target, 'rooms', 0)
-    t_neighborhood = getattr(target, 'neighborhood', None)
-    
-    # 2. Definim marjele de comparatie
-    price_min = t_price * 0.8
-    price_max = t_price * 1.2
-    
-    # Construim query-ul de baza
-    query = db.query(models.Listing).filter(
-        models.Listing.id != target.id,
-        models.Listing.price_eur >= price_min,
-        models.Listing.price_eur <= price_max
+    print(f"CMA: Am gasit {len(comparable_ids)} proprietati similare.")
+
+    # 3. Job id = (anunt, comparabile, updated_at): acelasi raport e generat o singura data,
+    #    cererile repetate primesc direct PDF-ul din report_store
+    key = report_key(target.id, comparable_ids, target.updated_at)
+    job = report_jobs.submit(
+        key, lambda: render_cma_report(listing_id, comparable_ids),
+        {"owner_id": target.owner_id, "listing_id": listing_id}
     )
+    return cma_job_response(job)
 
-    # Adaugam filtre optionale DOAR daca atributele exista în model
-    if hasattr(models.Listing, 'rooms') and t_rooms > 0:
-        query = query.filter(models.Listing.rooms == t_rooms)
-
-    if hasattr(models.Listing, 'neighborhood') and t_neighborhood:
-        query = query.filter(models.Listing.neighborhood == t_neighborhood)
-
-    # Filtram dupa suprafata DOAR daca exista coloana 'sqm' în model și avem o valoare
-    if hasattr(models.Listing, 'sqm') and t_surface > 0:
-        surface_min = t_surface * 0.8
-        surface_max = t_surface * 1.2
-        query = query.filter(
-            models.Listing.sqm >= surface_min,
-            models.Listing.sqm <= surface_max
-        )
-
-    # Luam maxim 5 rezultate
-    comparables = query.limit(5).all()
-    
-    print(f"CMA: Am gasit {len(comparables)} proprietati similare.")
+# 1b. STAREA UNUI RAPORT CMA
+@app.get("/agent/cma-jobs/{job_id}")
+def get_cma_job(
+    job_id: str = Path(..., pattern="^[0-9a-f]{32}$"),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    check_cma_job_access(job_id, current_user)
+    job = report_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job necunoscut")
+    return cma_job_response(job)
+
+# 1c. DESCARCARE RAPORT CMA
+@app.get("/agent/cma-jobs/{job_id}/pdf")
+def download_cma_report(
+    job_id: str = Path(..., pattern="^[0-9a-f]{32}$"),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    check_cma_job_access(job_id, current_user)
+    file_path = report_store.get(job_id)
+    if file_path is None:
+        raise HTTPException(404, detail="Raportul nu este (inca) disponibil")
+    return FileResponse(file_path, media_type='application/pdf', filename="CMA_Analiza.pdf")
+
+# 1d. METRICI RAPOARTE CMA (Admin)
+@app.get("/admin/cma-reports")
+def get_cma_report_stats(current_user: AuthUser = Depends(get_current_user)):
+    if current_user.id != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail="Acces interzis.")
 
-    # 3. Generam PDF-ul
-    file_path = generate_cma_report(target, comparables)
-    
-    return FileResponse(file_path, media_type='application/pdf', filename=f"CMA_Analiza.pdf")
+    return report_store.stats()
 
 
 
 @app.put("/agent/profile", response_model=schemas.AgentProfileCreate)
 def update_my_agent_profile(
     profile_data: schemas.AgentProfileCreate,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    token = authorization.split(" ")[1]
-    user_id = str(supabase.auth.get_user(token).user.id)
+    user_id = current_user.id
 
     # Cautam profilul existent sau cream unul nou
     agent = db.query(models.AgentProfile).filter(models.AgentProfile.id == user_id).first()
@@ -885,6 +1357,8 @@ def update_my_agent_profile(
         agent.bio = profile_data.bio
         # agent.logo_url = ... (daca trimiti și logo)
     
+    # Datele agentului apar in raspunsurile /listings (cache + ETag)
+    invalidate_listing_caches(db)
     db.commit()
     db.refresh(agent)
     return agent
@@ -892,32 +1366,23 @@ def update_my_agent_profile(
 
 @app.get("/agent/check-status")
 def check_is_agent(
-    authorization: str = Header(None),
+    current_user: Optional[AuthUser] = Depends(get_optional_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: return {"is_agent": False}
-    try:
-        token = authorization.split(" ")[1]
-        user_id = str(supabase.auth.get_user(token).user.id)
-        agent = db.query(models.AgentProfile).filter(models.AgentProfile.id == user_id).first()
-        return {"is_agent": agent is not None}
-    except:
-        return {"is_agent": False}
+    if not current_user: return {"is_agent": False}
+    agent = db.query(models.AgentProfile).filter(models.AgentProfile.id == current_user.id).first()
+    return {"is_agent": agent is not None}
     
 
 @app.put("/agent/profile", response_model=schemas.AgentProfileCreate)
 def update_my_agent_profile(
     profile_data: schemas.AgentProfileCreate,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    token = authorization.split(" ")[1]
-    
     # Luam datele userului curent
-    user_auth = supabase.auth.get_user(token)
-    user_email = user_auth.user.email
-    user_id = str(user_auth.user.id)
+    user_email = current_user.email
+    user_id = current_user.id
 
     agent = db.query(models.AgentProfile).filter(models.AgentProfile.id == user_id).first()
     
@@ -960,6 +1425,7 @@ def update_my_agent_profile(
         else:
             if not agent.is_verified: agent.is_verified = False 
         
+    invalidate_listing_caches(db)
     db.commit()
     db.refresh(agent)
     
@@ -973,12 +1439,10 @@ def update_my_agent_profile(
 # 3. Endpoint GET Profil (ca sa populam formularul când intra din nou)
 @app.get("/agent/profile")
 def get_my_agent_profile(
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    token = authorization.split(" ")[1]
-    user_id = str(supabase.auth.get_user(token).user.id)
+    user_id = current_user.id
     
     agent = db.query(models.AgentProfile).filter(models.AgentProfile.id == user_id).first()
     if not agent:
@@ -989,14 +1453,10 @@ def get_my_agent_profile(
 @app.post("/reviews", status_code=201)
 def create_review(
     review_data: schemas.ReviewCreate,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    token = authorization.split(" ")[1]
-    
-    user_auth = supabase.auth.get_user(token)
-    client_id = str(user_auth.user.id)
+    client_id = current_user.id
 
     # 1. Nu te poti nota singur
     if client_id == review_data.agent_id:
@@ -1037,6 +1497,7 @@ def create_review(
         agent.rating = new_rating
         # Daca ai coloana review_count în agent_profiles, o poti actualiza și pe aia
         # agent.review_count = total_reviews 
+        invalidate_listing_caches(db)
         db.commit()
 
     return {"message": "Recenzie salvata", "new_rating": new_rating}
@@ -1045,23 +1506,28 @@ def create_review(
 
 @app.get("/agent/leads", response_model=List[schemas.LeadOut])
 def get_agent_leads(
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    
     # 1. Obtinem ID-ul Agentului curent
-    try:
-        token = authorization.split(" ")[1]
-        user_auth = supabase.auth.get_user(token)
-        agent_id = str(user_auth.user.id)
-    except:
-        raise HTTPException(401, detail="Token invalid")
+    agent_id = current_user.id
+
+    # 2. Cautam conversatiile, impreuna cu ultimul mesaj (un singur query, LATERAL)
+    last_msg = select(
+        models.Message.content, models.Message.sender_id, models.Message.is_read
+    ).where(
+        models.Message.conversation_id == models.Conversation.id
+    ).order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(1).lateral("last_msg")
+
+    rows = db.execute(
+        select(models.Conversation, last_msg.c.content, last_msg.c.sender_id, last_msg.c.is_read)
+        .outerjoin(last_msg, true())
+        .filter(models.Conversation.seller_id == agent_id)
+        .order_by(desc(models.Conversation.updated_at))
+    ).all()
 
-    # 2. Cautam conversatiile
-    conversations = db.query(models.Conversation).filter(
-        models.Conversation.seller_id == agent_id
-    ).order_by(desc(models.Conversation.updated_at)).all()
+    # 3. Profilele tuturor clientilor dintr-un singur apel (si din cache)
+    profiles = get_profiles(conv.buyer_id for conv, *_ in rows)
 
     formatted_leads = []
 
@@ -1071,35 +1537,19 @@ def get_agent_leads(
 
     clean_agent_id = normalize_id(agent_id)
 
-    for conv in conversations:
-
-        buyer_profile = {}
-        try:
-            # Acum avem tabelul 'profiles', deci nu va mai da eroare!
-            res = supabase.table("profiles").select("full_name, avatar_url").eq("id", str(conv.buyer_id)).execute()
-            
-            if res.data and len(res.data) > 0:
-                buyer_profile = res.data[0]
-        except Exception as e:
-            print(f"Nu am gasit profil pt {conv.buyer_id}: {e}")
+    for conv, last_content, last_sender_id, last_is_read in rows:
 
         # Setam datele
+        buyer_profile = profiles.get(str(conv.buyer_id)) or {}
         client_name = buyer_profile.get("full_name") or f"Client #{str(conv.buyer_id)[:5]}"
         client_avatar = buyer_profile.get("avatar_url")
 
-        # Luam ultimul mesaj
-        last_msg = db.query(models.Message).filter(
-            models.Message.conversation_id == conv.id
-        ).order_by(desc(models.Message.created_at)).first()
-
-        client_display = f"Client #{str(conv.buyer_id)[:5]}" 
-
         # --- LOGICa STATUS CORECTATa ---
         status = "CONTACTAT"
         preview_text = "Conversatie începuta"
 
-        if last_msg:
-            clean_sender_id = normalize_id(last_msg.sender_id)
+        if last_content is not None:
+            clean_sender_id = normalize_id(last_sender_id)
             
             # Construim textul de preview
             if clean_sender_id == clean_agent_id:
@@ -1107,13 +1557,13 @@ def get_agent_leads(
             else:
                 sender_name = client_name
             
-            preview_text = f"{sender_name}: {last_msg.content}"
+            preview_text = f"{sender_name}: {last_content}"
 
             # Determinam Statusul
             if clean_sender_id == clean_agent_id:
                 # 1. Daca ultimul mesaj e trimis de MINE (Agent)
                 status = "RaSPUNS"
-            elif not last_msg.is_read:
+            elif not last_is_read:
                 # 2. Daca e trimis de EL (Client) și e NECITIT
                 status = "MESAJ NOU"
             else:
@@ -1133,35 +1583,52 @@ def get_agent_leads(
     
     return formatted_leads
 
+# Doar participantii pot marca; updated_at nu se schimba (ordinea din inbox ramane)
+MARK_AS_READ_SQL = text("""
+    WITH conv AS (
+        SELECT id FROM conversations
+        WHERE id = :conversation_id
+          AND (buyer_id = CAST(:user_id AS uuid) OR seller_id = CAST(:user_id AS uuid))
+    ),
+    updated AS (
+        UPDATE messages SET is_read = true
+        WHERE conversation_id IN (SELECT id FROM conv)
+          AND sender_id <> CAST(:user_id AS uuid)
+          AND is_read IS false
+        RETURNING 1
+    ),
+    -- Scadem doar ce am marcat: un mesaj trimis intre timp (+1 comis dupa snapshot-ul de mai sus)
+    -- ramane necitit si numarat, in loc sa fie sters de un reset la 0
+    read_count AS (
+        SELECT count(*) AS n FROM updated
+    ),
+    reset AS (
+        UPDATE conversations SET
+            buyer_unread = CASE WHEN buyer_id = CAST(:user_id AS uuid)
+                THEN GREATEST(buyer_unread - read_count.n, 0) ELSE buyer_unread END,
+            seller_unread = CASE WHEN seller_id = CAST(:user_id AS uuid)
+                THEN GREATEST(seller_unread - read_count.n, 0) ELSE seller_unread END
+        FROM read_count
+        WHERE id IN (SELECT id FROM conv) AND read_count.n > 0
+    )
+    SELECT n FROM read_count
+""")
+
 @app.put("/chat/conversations/{conversation_id}/read")
 def mark_conversation_as_read(
     conversation_id: int,
-    authorization: str = Header(None),
+    current_user: AuthUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not authorization: raise HTTPException(401)
-    
-    try:
-        token = authorization.split(" ")[1]
-        user_auth = supabase.auth.get_user(token)
-        current_user_id = str(user_auth.user.id)
-    except:
-        raise HTTPException(401, detail="Token invalid")
-
-    # 1. Identificam mesajele necitite care NU sunt ale mele
-    # (Adica mesajele primite de la celalalt)
-    messages_to_update = db.query(models.Message).filter(
-        models.Message.conversation_id == conversation_id,
-        models.Message.sender_id != current_user_id, # Mesaje primite
-        models.Message.is_read == False # Doar cele necitite
-    ).all()
-
-    count = len(messages_to_update)
-
-    # 2. Le actualizam manual (metoda sigura)
-    for msg in messages_to_update:
-        msg.is_read = True
-    
+    current_user_id = current_user.id
+
+    # Un singur statement: marcam mesajele primite ca citite si scadem contorul meu cu cate am marcat
+    count = db.execute(MARK_AS_READ_SQL, {
+        "conversation_id": conversation_id,
+        "user_id": current_user_id
+    }).scalar()
+    if count:
+        notify_read(db, conversation_id)
     db.commit()
     
     return {"message": "Conversatie actualizata", "updated_count": count}
@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.utils.search import normalize_search_term
+
+# View-ul materializat e creat in migrate_db.py si reimprospatat de automation.py
+CITY_KEY = "_all"
+
+# Folosite doar cat timp view-ul e gol (ex: inainte de primul ciclu din pipeline)
+DEFAULT_PRICE_SQM = {"SALE": 1500.0, "RENT": 7.0}
+
+NEIGHBORHOOD_STATS_SQL = text("""
+    SELECT neighborhood_key, neighborhood, transaction_type, listings_count,
+           p25_price_sqm, median_price_sqm, p75_price_sqm, last_listing_at, refreshed_at
+    FROM neighborhood_stats
+    ORDER BY transaction_type, listings_count DESC
+""")
+
+
+def refresh_neighborhood_stats(conn):
+    """Nu blocheaza citirile: cititorii vad vechile cifre pana la commit."""
+    conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY neighborhood_stats"))
+
+
+def fetch_neighborhood_stats(db) -> List[dict]:
+    """Tot view-ul (cateva zeci de randuri), cu un Session sau un Connection."""
+    return [dict(row._mapping) for row in db.execute(NEIGHBORHOOD_STATS_SQL)]
+
+
+class NeighborhoodStats:
+    """Cautare in memorie peste randurile view-ului, cu fallback la media orasului."""
+
+    def __init__(self, rows: List[dict]):
+        self._rows = {(row["neighborhood_key"], row["transaction_type"]): row for row in rows}
+
+    @classmethod
+    def load(cls, db) -> "NeighborhoodStats":
+        return cls(fetch_neighborhood_stats(db))
+
+    @classmethod
+    def load_or_empty(cls, db) -> "NeighborhoodStats":
+        """Ca load(), dar fara view (migrare nerulata) intoarce statistici goale si curata tranzactia."""
+        try:
+            return cls.load(db)
+        except Exception as e:
+            print(f"neighborhood_stats indisponibil ({e}). Rulează 'python migrate_db.py'.")
+            db.rollback()
+            return cls([])
+
+    def lookup(self, neighborhood: Optional[str], transaction_type: str = "SALE") -> Optional[dict]:
+        if neighborhood and neighborhood.strip():
+            key = normalize_search_term(neighborhood)
+            row = self._rows.get((key, transaction_type))
+            if row is not None:
+                return row
+            # "Copou - Parcul Expozitiei" -> "copou" (acelasi "contine" ca vechiul dictionar)
+            matches = [
+                row for (candidate, tt), row in self._rows.items()
+                if tt == transaction_type and candidate != CITY_KEY and candidate in key
+            ]
+            if matches:
+                return max(matches, key=lambda r: len(r["neighborhood_key"]))
+        return self._rows.get((CITY_KEY, transaction_type))
+
+    def median_price_sqm(self, neighborhood: Optional[str], transaction_type: str = "SALE") -> float:
+        row = self.lookup(neighborhood, transaction_type)
+        if row is None or row["median_price_sqm"] is None:
+            return DEFAULT_PRICE_SQM[transaction_type]
+        return float(row["median_price_sqm"])
@@ -1,8 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
-from geoalchemy2.shape import to_shape 
 from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from .database import Base
 from sqlalchemy.dialects.postgresql import JSONB
@@ -44,13 +43,14 @@ class Listing(Base):
     status = Column(String, default="ACTIVE")
 
     views = Column(Integer, default=0)
+    views_reset_at = Column(DateTime(timezone=True), nullable=True)  # flush-ul ignora vizualizarile mai vechi
     favorites_count = Column(Integer, default=0)
 
     # Timestamp pentru ultima verificare a anuntului
     last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     agent_profile = relationship("AgentProfile", primaryjoin="foreign(Listing.owner_id) == remote(AgentProfile.id)", uselist=False, viewonly=True)
     
@@ -63,27 +63,26 @@ class Listing(Base):
     ai_tags = Column(JSONB, nullable=True)
     
     # HELPERE PENTRU PYDANTIC 
-    @property
-    def lat(self):
-        try:
-            if self.geom:
-                # Extrage Y (Latitudine) din obiectul geometric
-                return to_shape(self.geom).y
-        except: pass
-        return None
-
-    @property
-    def lng(self):
-        try:
-            if self.geom:
-                # Extrage X (Longitudine)
-                return to_shape(self.geom).x
-        except: pass
-        return None
-    
+    # Coordonatele sunt calculate direct in SQL (ST_Y/ST_X) in acelasi SELECT,
+    # deci la serializare nu mai decodam WKB-ul cu Shapely pentru fiecare rand.
+    lat = column_property(func.ST_Y(geom, type_=Float))
+    lng = column_property(func.ST_X(geom, type_=Float))
+
+
+# Index pentru feed-ul paginat keyset (status, tip, updated_at DESC, id DESC)
+Index(
+    "ix_listings_feed",
+    Listing.status,
+    Listing.transaction_type,
+    Listing.updated_at.desc(),
+    Listing.id.desc(),
+)
+
 
 class Favorite(Base):
     __tablename__ = "favorites"  
+    # Un user poate salva un anunt o singura data (toggle-ul se bazeaza pe ON CONFLICT)
+    __table_args__ = (UniqueConstraint("user_id", "listing_id", name="uq_favorites_user_listing"),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(UUID(as_uuid=False), nullable=False)
     listing_id = Column(Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False)
@@ -112,6 +111,10 @@ class Conversation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Mesaje necitite per participant (mentinute de send/reply, resetate de mark-as-read)
+    buyer_unread = Column(Integer, nullable=False, default=0, server_default="0")
+    seller_unread = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relații (Opțional, ajută la query-uri complexe)
     messages = relationship("Message", back_populates="conversation")
     listing = relationship("Listing") 
@@ -129,6 +132,21 @@ class Message(Base):
     conversation = relationship("Conversation", back_populates="messages")
 
 
+# Istoric paginat (keyset) + ultimul mesaj per conversatie; necitite (index partial)
+Index(
+    "ix_messages_conversation_history",
+    Message.conversation_id,
+    Message.created_at.desc(),
+    Message.id.desc(),
+)
+Index(
+    "ix_messages_unread",
+    Message.conversation_id,
+    Message.sender_id,
+    postgresql_where=Message.is_read.is_(False),
+)
+
+
 class AgentProfile(Base):
     __tablename__ = "agent_profiles"
     id = Column(UUID(as_uuid=False), primary_key=True) # UUID
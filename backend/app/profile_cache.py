@@ -0,0 +1,52 @@
+import os
+import threading
+from typing import Dict, Iterable
+
+from cachetools import TTLCache
+
+from app.auth import supabase
+
+# Profilele (nume, avatar) se schimba rar; le tinem cateva minute in memorie
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "5000"))
+
+_profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+_cache_lock = threading.Lock()
+
+
+def get_profiles(user_ids: Iterable) -> Dict[str, dict]:
+    """
+    Returneaza {user_id: {"full_name", "avatar_url"}} pentru toti userii ceruti.
+    Ce lipseste din cache se aduce dintr-un singur apel Supabase (.in_()).
+    Userii fara profil primesc {} (si sunt tinuti si ei in cache).
+    """
+    ids = {str(uid) for uid in user_ids if uid}
+    profiles = {}
+    with _cache_lock:
+        for uid in ids:
+            cached = _profile_cache.get(uid)
+            if cached is not None:
+                profiles[uid] = cached
+    missing = [uid for uid in ids if uid not in profiles]
+
+    if missing and supabase is not None:
+        try:
+            res = supabase.table("profiles").select("id, full_name, avatar_url").in_("id", missing).execute()
+            fetched = {str(row["id"]): row for row in (res.data or [])}
+        except Exception as e:
+            # Nu blocam pagina: afisam "Client #..." si reincercam la urmatorul request
+            print(f"Nu am putut incarca profilele ({len(missing)}): {e}")
+            return profiles
+
+        with _cache_lock:
+            for uid in missing:
+                profile = fetched.get(uid, {})
+                _profile_cache[uid] = profile
+                profiles[uid] = profile
+
+    return profiles
+
+
+def clear_profile_cache():
+    with _cache_lock:
+        _profile_cache.clear()
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+
+from cachetools import TTLCache
+from sqlalchemy import text
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# --- CONFIGURARE ---
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "60"))          # secunde
+QUERY_CACHE_MAX_ITEMS = int(os.getenv("QUERY_CACHE_MAX_ITEMS", "1000"))
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+# Optional: cache comun pentru toti workerii (pip install redis)
+REDIS_URL = os.getenv("REDIS_URL")
+
+LISTINGS_CHANNEL = "listings_changed"
+GENERATION_KEY = "nidus:listings:generation"
+
+
+def notify_listings_changed(db, source: str = "api"):
+    """
+    Anunta toate procesele API ca s-au schimbat anunturile (NOTIFY, livrat la commit).
+    Se poate apela cu un Session sau un Connection, din API sau din scripturile din pipeline.
+    Dupa commit, procesul care a scris apeleaza si query_cache.bump() (generatia din Redis).
+    """
+    db.execute(text("SELECT pg_notify(:channel, :source)"), {"channel": LISTINGS_CHANNEL, "source": source})
+
+
+class QueryCache:
+    """
+    Cache pentru raspunsurile deja serializate ale cautarilor.
+    Cheia contine generatia curenta: orice scriere pe anunturi creste generatia,
+    iar intrarile vechi nu mai sunt citite (si expira singure prin TTL / LRU).
+    """
+
+    def __init__(self, ttl: int = QUERY_CACHE_TTL, max_items: int = QUERY_CACHE_MAX_ITEMS,
+                 redis_url: str = REDIS_URL, enabled: bool = QUERY_CACHE_ENABLED):
+        self.ttl = ttl
+        self.enabled = enabled
+        self._local = TTLCache(maxsize=max_items, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._redis = None
+        if redis_url and redis is not None:
+            try:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+                self._redis.ping()
+            except Exception as e:
+                print(f"Query cache: Redis indisponibil ({e}), folosesc doar memoria locala")
+                self._redis = None
+
+    # --- Generatie ---
+    def generation(self) -> int:
+        if self._redis is not None:
+            try:
+                return int(self._redis.get(GENERATION_KEY) or 0)
+            except Exception:
+                pass
+        return self._generation
+
+    def _bump_local(self):
+        with self._lock:
+            self._generation += 1
+            self._local.clear()
+            self.invalidations += 1
+
+    def bump(self):
+        """
+        Apelat doar de procesul care a facut scrierea (dupa commit): invalideaza local
+        si creste o singura data generatia din Redis, comuna tuturor workerilor.
+        """
+        self._bump_local()
+        if self._redis is not None:
+            try:
+                self._redis.incr(GENERATION_KEY)
+            except Exception as e:
+                print(f"Query cache: nu am putut creste generatia in Redis: {e}")
+
+    def handle_notify(self, payload):
+        # Callback pentru LISTEN listings_changed (vezi app/realtime.py). Doar local:
+        # generatia din Redis a crescut-o deja procesul care a scris, iar un INCR
+        # per worker ar invalida de N ori intrarile abia puse de ceilalti.
+        self._bump_local()
+
+    # --- Citire / scriere ---
+    def make_key(self, namespace: str, params: dict) -> str:
+        raw = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(raw.encode()).hexdigest()
+        return f"nidus:{namespace}:{self.generation()}:{digest}"
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._local.get(key)
+        if value is None and self._redis is not None:
+            try:
+                raw = self._redis.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    with self._lock:
+                        self._local[key] = value
+            except Exception:
+                value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value):
+        """value trebuie sa fie serializabil JSON (ex: {"body": str, "headers": {...}})."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._local[key] = value
+        if self._redis is not None:
+            try:
+                self._redis.set(key, json.dumps(value), ex=self.ttl)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "backend": "memory+redis" if self._redis is not None else "memory",
+                "generation": self.generation(),
+                "items": len(self._local),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+query_cache = QueryCache()
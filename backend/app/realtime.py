@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+from collections import defaultdict
+
+from fastapi import WebSocket
+from sqlalchemy import text
+
+from app.database import SQLALCHEMY_DATABASE_URL
+
+# --- CONFIGURARE ---
+# LISTEN are nevoie de o conexiune directa (pooler-ul Supabase in mod "transaction" nu pastreaza LISTEN)
+REALTIME_DATABASE_URL = os.getenv("REALTIME_DATABASE_URL") or SQLALCHEMY_DATABASE_URL
+CHAT_CHANNEL = "chat_events"
+REALTIME_RECONNECT_DELAY = float(os.getenv("REALTIME_RECONNECT_DELAY", "5"))
+
+# NOTIFY accepta maxim ~8000 de bytes; mesajele mai lungi pleaca fara content,
+# iar clientul le cere prin GET .../messages
+MAX_NOTIFY_CONTENT_BYTES = 6000
+
+
+# --- PRODUCATORI (rutele sync, in aceeasi tranzactie cu mesajul) ---
+# pg_notify e livrat abia la COMMIT, deci nimeni nu primeste un mesaj care a dat rollback.
+# Payload-ul e construit in SQL, ca sa contina contoarele deja incrementate.
+NOTIFY_MESSAGE_SQL = text("""
+    SELECT pg_notify(:channel, json_build_object(
+        'type', 'message',
+        'conversation_id', c.id,
+        'buyer_id', c.buyer_id,
+        'seller_id', c.seller_id,
+        'buyer_unread', c.buyer_unread,
+        'seller_unread', c.seller_unread,
+        'message', json_build_object(
+            'id', m.id,
+            'conversation_id', m.conversation_id,
+            'sender_id', m.sender_id,
+            'content', CASE WHEN octet_length(m.content) <= :max_content THEN m.content END,
+            'is_read', m.is_read,
+            'created_at', m.created_at
+        )
+    )::text)
+    FROM messages m JOIN conversations c ON c.id = m.conversation_id
+    WHERE m.id = :message_id
+""")
+
+NOTIFY_READ_SQL = text("""
+    SELECT pg_notify(:channel, json_build_object(
+        'type', 'read',
+        'conversation_id', c.id,
+        'buyer_id', c.buyer_id,
+        'seller_id', c.seller_id,
+        'buyer_unread', c.buyer_unread,
+        'seller_unread', c.seller_unread
+    )::text)
+    FROM conversations c
+    WHERE c.id = :conversation_id
+""")
+
+
+def notify_new_message(db, message_id: int):
+    """Apelat dupa flush (mesajul are id), inainte de commit."""
+    db.execute(NOTIFY_MESSAGE_SQL, {
+        "channel": CHAT_CHANNEL,
+        "message_id": message_id,
+        "max_content": MAX_NOTIFY_CONTENT_BYTES
+    })
+
+
+def notify_read(db, conversation_id: int):
+    db.execute(NOTIFY_READ_SQL, {"channel": CHAT_CHANNEL, "conversation_id": conversation_id})
+
+
+# --- CONSUMATOR (un LISTEN per worker uvicorn) ---
+class ChatHub:
+    """Socket-urile conectate la ACEST worker, grupate pe user."""
+
+    def __init__(self):
+        self._sockets = defaultdict(set)  # user_id -> {WebSocket}
+
+    def connect(self, user_id: str, websocket: WebSocket):
+        self._sockets[user_id].add(websocket)
+
+    def disconnect(self, user_id: str, websocket: WebSocket):
+        sockets = self._sockets.get(user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._sockets[user_id]
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(s) for s in self._sockets.values())
+
+    async def dispatch(self, event: dict):
+        if not isinstance(event, dict):
+            return
+        # Fiecare participant primeste propriul contor de necitite
+        for role in ("buyer", "seller"):
+            user_id = str(event.get(f"{role}_id"))
+            sockets = list(self._sockets.get(user_id, ()))
+            if not sockets:
+                continue
+            payload = {
+                "type": event["type"],
+                "conversation_id": event["conversation_id"],
+                "unread_count": event.get(f"{role}_unread", 0),
+            }
+            if "message" in event:
+                payload["message"] = event["message"]
+            for websocket in sockets:
+                try:
+                    await websocket.send_json(payload)
+                except Exception:
+                    self.disconnect(user_id, websocket)
+
+
+class NotifyListener:
+    """
+    O singura conexiune asyncpg per worker, cu LISTEN pe toate canalele inregistrate
+    (chat, invalidarea cache-ului de cautari...). Se reconecteaza singura.
+    """
+
+    def __init__(self, dsn: str = REALTIME_DATABASE_URL):
+        self.dsn = self._asyncpg_dsn(dsn) if dsn else None
+        self._handlers = defaultdict(list)  # canal -> [callback(payload)]
+        self._task = None
+
+    def on(self, channel: str, handler):
+        """handler(payload) poate fi functie normala sau async; payload e dict (JSON) sau str."""
+        self._handlers[channel].append(handler)
+
+    @staticmethod
+    def _asyncpg_dsn(url: str) -> str:
+        # asyncpg vrea "postgresql://", fara driverul SQLAlchemy in schema
+        for prefix in ("postgresql+psycopg2://", "postgresql+asyncpg://", "postgres://"):
+            if url.startswith(prefix):
+                return "postgresql://" + url[len(prefix):]
+        return url
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            event = payload
+        for handler in self._handlers.get(channel, ()):
+            result = handler(event)
+            if asyncio.iscoroutine(result):
+                asyncio.get_running_loop().create_task(result)
+
+    async def _run(self):
+        import asyncpg
+
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                for channel in self._handlers:
+                    await conn.add_listener(channel, self._on_notify)
+                print(f"Realtime: LISTEN {', '.join(self._handlers)} activ")
+                await closed.wait()
+                print("Realtime: conexiunea LISTEN s-a inchis, reconectam...")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Realtime: eroare LISTEN ({e}), reincercam in {REALTIME_RECONNECT_DELAY}s")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(REALTIME_RECONNECT_DELAY)
+
+    def start(self):
+        if self.dsn and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+chat_hub = ChatHub()
+pg_listener = NotifyListener()
+pg_listener.on(CHAT_CHANNEL, chat_hub.dispatch)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc
+from sqlalchemy import or_, desc, tuple_
 from typing import List, Optional
 
 from app.database import get_db
 from app import models, schemas
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.search import fuzzy_contains
 
 router = APIRouter(
     prefix="/listings",
@@ -13,6 +15,7 @@ router = APIRouter(
 
 @router.get("/", response_model=List[schemas.ListingOut])
 def get_listings(
+    response: Response,
     db: Session = Depends(get_db),
     # --- FILTRELE DIN URL ---
     transaction_type: str = Query("SALE", description="SALE sau RENT"),
@@ -22,7 +25,8 @@ def get_listings(
     rooms: Optional[int] = Query(None, description="Numar minim camere (ex: 2 inseamna 2+)"),
     neighborhood: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Cursor opac primit in header-ul X-Next-Cursor")
 ):
     """
     Endpoint principal pentru căutare. 
@@ -48,38 +52,27 @@ def get_listings(
     if rooms:
         query = query.filter(models.Listing.rooms >= rooms)
 
-    if neighborhood:
-        # Căutare parțială (insensitive case)
-        query = query.filter(models.Listing.neighborhood.ilike(f"%{neighborhood}%"))
+    if neighborhood and neighborhood.strip():
+        # Căutare parțială (insensitive case, fără diacritice) - index pg_trgm
+        query = query.filter(fuzzy_contains(models.Listing.neighborhood, neighborhood))
 
-    # 3. Sortare (Cele mai noi primele)
-    query = query.order_by(desc(models.Listing.updated_at))
+    # 3. Paginare keyset (daca avem cursor, offset-ul nu mai conteaza)
+    if cursor:
+        last_updated_at, last_id = decode_cursor(cursor)
+        if last_updated_at is not None:
+            query = query.filter(
+                tuple_(models.Listing.updated_at, models.Listing.id) < tuple_(last_updated_at, last_id)
+            )
+        else:
+            query = query.filter(models.Listing.id < last_id)
+        offset = 0
 
-    # 4. Paginare
+    # 4. Sortare (Cele mai noi primele) + Paginare
+    query = query.order_by(desc(models.Listing.updated_at), desc(models.Listing.id))
     results = query.limit(limit).offset(offset).all()
-    
-    # 5. Procesare Lat/Lng din Geometrie (pentru Pydantic)
-    # SQLAlchemy returnează un obiect WKBElement pentru geom. 
-    # Trebuie să extragem coordonatele manual dacă vrem să le trimitem curat.
-    # O variantă simplă este să lăsăm frontend-ul să primească tot obiectul, 
-    # dar mai elegant e să facem mapping aici.
-    
-    final_results = []
-    for item in results:
-        # Mic hack pentru a adăuga lat/lng la obiectul Pydantic
-        # Deoarece item este un obiect SQLAlchemy, putem accesa proprietatile
-        try:
-            # GeoAlchemy2 convertește automat la citire, dar depinde de configurație.
-            # Dacă folosim to_shape:
-            from geoalchemy2.shape import to_shape
-            if item.geom:
-                point = to_shape(item.geom)
-                item.lat = point.y
-                item.lng = point.x
-        except:
-            item.lat = None
-            item.lng = None
-        
-        final_results.append(item)
 
-    return final_results
\ No newline at end of file
+    if len(results) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(results[-1].updated_at, results[-1].id)
+    
+    # lat/lng vin deja calculate din SQL (column_property pe Listing)
+    return results
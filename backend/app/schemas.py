@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional, Union, Dict, Any
 from datetime import datetime
 from uuid import UUID
@@ -70,6 +70,96 @@ class ListingOut(ListingBase):
         from_attributes = True # Permite conversia automata din SQLAlchemy
         populate_by_name = True # Permite folosirea alias-urilor la output
 
+ListingOutList = TypeAdapter(List[ListingOut])
+
+
+# Varianta "light" pentru liste/carduri (fara descriere, galerie si agent)
+class ListingSummaryOut(BaseModel):
+    id: int
+    title: str
+    price_eur: float
+    sqm: Optional[float] = None
+    rooms: Optional[int] = None
+    neighborhood: Optional[str] = None
+    image_url: Optional[str] = None
+    transaction_type: str = "SALE"
+    source_platform: Optional[str] = None
+    is_claimed: bool = False
+    views: int = 0
+    favorites_count: int = 0
+
+    latitude: Optional[float] = Field(None, alias="lat")
+    longitude: Optional[float] = Field(None, alias="lng")
+
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+ListingSummaryList = TypeAdapter(List[ListingSummaryOut])
+
+
+# --- HARTA (viewport) ---
+class MapPin(BaseModel):
+    id: int
+    latitude: float
+    longitude: float
+    price_eur: float
+    rooms: Optional[int] = None
+    sqm: Optional[float] = None
+    image_url: Optional[str] = None
+
+class MapCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    median_price: Optional[float] = None
+    listing_id: Optional[int] = None # Doar pentru clustere cu un singur anunt
+
+class MapResponse(BaseModel):
+    zoom: int
+    clustered: bool
+    clusters: List[MapCluster] = []
+    pins: List[MapPin] = []
+    truncated: bool = False
+
+
+# --- FACETE (numaratori pentru FilterBar) ---
+class FacetCount(BaseModel):
+    value: Union[int, str]
+    label: Optional[str] = None # Cartierul asa cum apare in anunturi (value e forma normalizata)
+    count: int
+
+class PriceBucket(BaseModel):
+    min_price: float
+    max_price: float
+    count: int
+
+class FacetsResponse(BaseModel):
+    transaction_type: str
+    total: int
+    neighborhoods: List[FacetCount] = []
+    rooms: List[FacetCount] = []
+    transaction_types: List[FacetCount] = []
+    price_histogram: List[PriceBucket] = []
+
+
+# --- STATISTICI DE PIATA (view-ul neighborhood_stats) ---
+class NeighborhoodStatsOut(BaseModel):
+    neighborhood_key: str
+    neighborhood: Optional[str] = None
+    transaction_type: str
+    listings_count: int
+    p25_price_sqm: Optional[float] = None
+    median_price_sqm: Optional[float] = None
+    p75_price_sqm: Optional[float] = None
+    last_listing_at: Optional[datetime] = None
+    refreshed_at: Optional[datetime] = None
+
+NeighborhoodStatsList = TypeAdapter(List[NeighborhoodStatsOut])
+
 
 # --- CLAIM SCHEMAS ---
 class ClaimRequestCreate(BaseModel):
@@ -0,0 +1,145 @@
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# --- CONFIGURARE ---
+# Directorul de pe disc e singurul strat vazut si de scripturile din pipeline
+# (scraper, janitor...), care ruleaza in procese separate de API: implicit e un
+# director comun in /tmp. TILE_CACHE_DIR="" il dezactiveaza (doar memorie).
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nidus_tiles")) or None
+TILE_CACHE_MAX_ITEMS = int(os.getenv("TILE_CACHE_MAX_ITEMS", "2000"))
+TILE_CACHE_TTL = int(os.getenv("TILE_CACHE_TTL", "300"))  # secunde, pentru stratul din memorie
+
+TILE_MIN_ZOOM = 0
+TILE_MAX_ZOOM = 22
+TILE_EXTENT = 4096
+TILE_BUFFER = 64  # trebuie sa fie acelasi ca in ST_AsMVTGeom
+
+
+def lnglat_to_tile(lng: float, lat: float, z: int):
+    """Coordonate fractionare (x, y) ale tile-ului care contine punctul (schema XYZ)."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lng + 180.0) / 360.0 * n
+    lat_rad = math.radians(lat)
+    y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+class TileCache:
+    """LRU in memorie (cu TTL) + copie optionala pe disc, invalidare per tile."""
+
+    def __init__(self, max_items: int = TILE_CACHE_MAX_ITEMS, cache_dir: Optional[str] = TILE_CACHE_DIR,
+                 ttl: int = TILE_CACHE_TTL):
+        self.max_items = max_items
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._memory = OrderedDict()  # (z, x, y) -> (expira_la, bytes)
+        self._lock = threading.Lock()
+
+    def _path(self, z, x, y):
+        return os.path.join(self.cache_dir, str(z), str(x), f"{y}.mvt")
+
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        key = (z, x, y)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._memory.move_to_end(key)
+                else:
+                    del self._memory[key]
+                    entry = None
+
+        if entry is not None:
+            # Alt proces (ex: janitor) poate sa fi sters fisierul intre timp
+            if self.cache_dir and not os.path.exists(self._path(z, x, y)):
+                self._forget(key)
+                return None
+            return entry[1]
+
+        if self.cache_dir:
+            try:
+                with open(self._path(z, x, y), "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+            self._remember(key, data)
+            return data
+        return None
+
+    def put(self, z: int, x: int, y: int, data: bytes):
+        self._remember((z, x, y), data)
+        if self.cache_dir:
+            path = self._path(z, x, y)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)  # scriere atomica
+            except OSError as e:
+                print(f"Tile cache: nu am putut scrie {path}: {e}")
+
+    def invalidate_tile(self, z: int, x: int, y: int):
+        self._forget((z, x, y))
+        if self.cache_dir:
+            try:
+                os.remove(self._path(z, x, y))
+            except OSError:
+                pass
+
+    def invalidate_point(self, lng: Optional[float], lat: Optional[float]):
+        """Sterge, la fiecare zoom, tile-ul care contine punctul (si vecinii, daca e in buffer)."""
+        if lng is None or lat is None:
+            return
+        margin = TILE_BUFFER / TILE_EXTENT
+        for z in range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1):
+            n = 2 ** z
+            fx, fy = lnglat_to_tile(lng, lat, z)
+            x, y = int(fx), int(fy)
+            xs = {x}
+            ys = {y}
+            if fx - x < margin: xs.add(x - 1)
+            if fx - x > 1 - margin: xs.add(x + 1)
+            if fy - y < margin: ys.add(y - 1)
+            if fy - y > 1 - margin: ys.add(y + 1)
+            for tx in xs:
+                for ty in ys:
+                    if 0 <= tx < n and 0 <= ty < n:
+                        self.invalidate_tile(z, tx, ty)
+
+    def invalidate_listing(self, listing):
+        """Helper pentru scripturi: citeste coordonatele direct de pe modelul Listing."""
+        try:
+            self.invalidate_point(listing.lng, listing.lat)
+        except Exception as e:
+            print(f"Tile cache: invalidare esuata pentru ID {getattr(listing, 'id', None)}: {e}")
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def handle_notify(self, payload):
+        # Callback pentru LISTEN listings_changed (vezi app/realtime.py): scrierile din
+        # alte procese (pipeline, alti workeri) golesc stratul din memorie. Tile-urile
+        # de pe disc au fost deja sterse punctual de procesul care a scris.
+        self.clear_memory()
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl, data)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+
+
+tile_cache = TileCache()
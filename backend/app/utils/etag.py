@@ -0,0 +1,30 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+
+# ETag-uri "strong": acelasi tag doar pentru aceiasi octeti. Fiecare endpoint pune in parts
+# tot ce intra in corp (versiunea randului inclusiv views, sau direct corpul serializat).
+def make_etag(*parts) -> str:
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()[:32]}"'
+
+
+# If-None-Match foloseste comparatia weak (RFC 9110): ignoram prefixul W/ al clientului
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag, "Cache-Control": "no-cache"})
@@ -0,0 +1,23 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+
+# Cursor opac pentru paginare keyset pe (timestamp, id).
+# Clientul nu trebuie sa il interpreteze, doar sa il trimita inapoi.
+def encode_cursor(ts: Optional[datetime], row_id: int) -> str:
+    raw = f"{ts.isoformat() if ts else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        ts_part, id_part = raw.rsplit("|", 1)
+        ts = datetime.fromisoformat(ts_part) if ts_part else None
+        return ts, int(id_part)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor invalid")
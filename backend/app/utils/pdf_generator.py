@@ -3,6 +3,7 @@ import datetime
 import os
 import tempfile
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image  
 from io import BytesIO 
 import qrcode
@@ -19,8 +20,27 @@ COLOR_SUCCESS = (52, 199, 89)       # Apple Green
 COLOR_WARNING = (255, 149, 0)       # Apple Orange
 COLOR_DIVIDER = (229, 229, 234)     # Light Grey
 
+# Timeout-uri pentru descarcarea imaginilor (anunt principal / comparabile)
+IMAGE_TIMEOUT_MAIN = 5
+IMAGE_TIMEOUT_THUMB = 3
+
+def _download_image(url, timeout):
+    try:
+        response = requests.get(url, timeout=timeout)
+        return response.content if response.status_code == 200 else None
+    except Exception:
+        return None
+
+def prefetch_images(urls, timeout=IMAGE_TIMEOUT_MAIN):
+    """Descarca toate imaginile raportului in paralel (in loc de una dupa alta la desenare)."""
+    urls = [u for u in dict.fromkeys(urls) if u]
+    if not urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        return dict(zip(urls, pool.map(lambda u: _download_image(u, timeout), urls)))
+
 class ApplePDF(FPDF):
-    def __init__(self):
+    def __init__(self, work_dir=None, images=None):
         super().__init__()
         self.font_registered = False
         self._register_fonts()
@@ -29,6 +49,15 @@ class ApplePDF(FPDF):
         self.header_qr_path = None
         self.header_qr_link = None
 
+        # Fisierele intermediare (QR, crop-uri) stau in work_dir, sters la finalul raportului
+        self.work_dir = work_dir
+        self.image_data = images or {}  # (nu "images": e registrul intern al FPDF)
+
+    def fetch_image(self, url, timeout):
+        if url in self.image_data:
+            return self.image_data[url]
+        return _download_image(url, timeout)
+
     def _register_fonts(self):
         font_paths = [
             'DejaVuSans.ttf', 
@@ -103,7 +132,7 @@ class ApplePDF(FPDF):
             qr.make(fit=True)
             img = qr.make_image(fill_color="black", back_color="white")
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".png", dir=self.work_dir) as tmp:
                 img.save(tmp)
                 self.header_qr_path = tmp.name
                 self.header_qr_link = url
@@ -136,7 +165,7 @@ class ApplePDF(FPDF):
                 img = img.crop((0, offset, img.width, offset + new_height))
 
             # Salvam intr-un temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg", dir=self.work_dir) as tmp_file:
                 img.save(tmp_file, quality=90)
                 return tmp_file.name
         except Exception as e:
@@ -220,10 +249,10 @@ class ApplePDF(FPDF):
         
         if img_url:
             try:
-                response = requests.get(img_url, stream=True, timeout=5)
-                if response.status_code == 200:
+                img_data = self.fetch_image(img_url, IMAGE_TIMEOUT_MAIN)
+                if img_data:
                     # Folosim functia de crop
-                    processed_img_path = self._crop_and_save_image(response.content, img_w, img_h)
+                    processed_img_path = self._crop_and_save_image(img_data, img_w, img_h)
                     
                     if processed_img_path:
                         self.rounded_rect(img_x, img_y, img_w, img_h, 4, 'F')
@@ -341,10 +370,10 @@ class ApplePDF(FPDF):
         
         if img_url:
             try:
-                response = requests.get(img_url, stream=True, timeout=3)
-                if response.status_code == 200:
+                img_data = self.fetch_image(img_url, IMAGE_TIMEOUT_THUMB)
+                if img_data:
                     # Crop si la comparabile
-                    processed_path = self._crop_and_save_image(response.content, thumb_size, thumb_size)
+                    processed_path = self._crop_and_save_image(img_data, thumb_size, thumb_size)
                     
                     self.set_fill_color(245, 245, 245)
                     self.rounded_rect(thumb_x, thumb_y, thumb_size, thumb_size, 2, 'F')
@@ -399,7 +428,7 @@ class ApplePDF(FPDF):
         self.line(26, start_y + row_height, 186, start_y + row_height)
         self.set_y(start_y + row_height)
 
-    def draw_insight_card(self, estimated_value, avg_sqm, target_listing, valid_comps):
+    def draw_insight_card(self, estimated_value, target_listing, basis_text, market_text):
         start_y = self.get_y()
         card_height = 72
         
@@ -427,10 +456,10 @@ class ApplePDF(FPDF):
         self.cell(0, 14, f"{estimated_value:,.0f} EUR", 0, 1, 'C')
         self.set_text_color(*COLOR_TEXT_SECONDARY)
         self.set_system_font('', 8.5)
-        self.cell(0, 5, f"Based on {valid_comps} comparable properties", 0, 1, 'C')
+        self.cell(0, 5, basis_text, 0, 1, 'C')
         self.ln(5)
         self.set_system_font('', 8)
-        self.cell(0, 4, f"Market average: {avg_sqm} EUR/m2", 0, 1, 'C')
+        self.cell(0, 4, market_text, 0, 1, 'C')
         self.ln(3)
         
         t_price = getattr(target_listing, 'price_eur', 0)
@@ -483,10 +512,22 @@ class ApplePDF(FPDF):
         h = self.h
         self._out('%.2f %.2f %.2f %.2f %.2f %.2f c' % (x1*self.k, (h-y1)*self.k, x2*self.k, (h-y2)*self.k, x3*self.k, (h-y3)*self.k))
 
-def generate_cma_report(target_listing, comparables):
+def generate_cma_report(target_listing, comparables, market_stats=None):
+    """
+    Intoarce PDF-ul ca bytes. Imaginile se descarca in paralel, iar fisierele temporare
+    (QR, imagini decupate) sunt intr-un director sters la final, deci /tmp nu creste.
+    """
+    images = prefetch_images([getattr(target_listing, 'image_url', None)] +
+                             [getattr(c, 'image_url', None) for c in comparables])
+    with tempfile.TemporaryDirectory(prefix="nidus_cma_") as work_dir:
+        pdf = ApplePDF(work_dir=work_dir, images=images)
+        _draw_cma_report(pdf, target_listing, comparables, market_stats)
+        # fpdf 1.7 construieste documentul ca str latin-1
+        return pdf.output(dest='S').encode('latin-1')
+
+def _draw_cma_report(pdf, target_listing, comparables, market_stats):
     valid_comps = 0
     total_sqm_price = 0
-    pdf = ApplePDF()
 
     listing_id = getattr(target_listing, 'id', None)
     base_url = "http://localhost:3000"
@@ -528,14 +569,20 @@ def generate_cma_report(target_listing, comparables):
         pdf.cell(0, 10, "No comparable properties found", 0, 1, 'C')
     
     pdf.ln(12)
-    if valid_comps > 0:
+    t_surface = getattr(target_listing, 'sqm', 0) or 0
+    if market_stats and market_stats.get('median_price_sqm') and t_surface > 0:
+        # Mediana precalculata a cartierului (neighborhood_stats), nu media catorva comparabile
+        median_sqm = int(market_stats['median_price_sqm'])
+        estimated = median_sqm * t_surface
+        basis = f"Based on {market_stats['listings_count']} active listings in {market_stats['neighborhood']}"
+        market = (f"Market median: {median_sqm} EUR/m2 "
+                  f"(p25-p75: {int(market_stats['p25_price_sqm'])} - {int(market_stats['p75_price_sqm'])} EUR/m2)")
+        pdf.draw_insight_card(estimated, target_listing, basis, market)
+    elif valid_comps > 0:
         avg_sqm = int(total_sqm_price / valid_comps)
-        t_surface = getattr(target_listing, 'sqm', 0)
         estimated = avg_sqm * t_surface
-        pdf.draw_insight_card(estimated, avg_sqm, target_listing, valid_comps)
+        pdf.draw_insight_card(estimated, target_listing,
+                              f"Based on {valid_comps} comparable properties",
+                              f"Market average: {avg_sqm} EUR/m2")
     else:
-        pdf.cell(0, 10, "Insufficient data for market valuation", 0, 1, 'C')
-
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    pdf.output(temp_file.name)
-    return temp_file.name
\ No newline at end of file
+        pdf.cell(0, 10, "Insufficient data for market valuation", 0, 1, 'C')
\ No newline at end of file
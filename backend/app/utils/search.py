@@ -0,0 +1,59 @@
+import re
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import func, or_
+
+from app import models
+
+
+def normalize_search_term(term: str) -> str:
+    """'  Păcurari ' -> 'pacurari' (la fel ca f_unaccent(lower(...)) din Postgres)."""
+    term = unicodedata.normalize("NFKD", term.strip().lower())
+    term = "".join(ch for ch in term if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", term)
+
+
+def unaccent_lower(column):
+    # Expresia trebuie sa fie IDENTICA cu cea din indexul GIN (vezi migrate_db.py),
+    # altfel Postgres nu foloseste indexul trigram.
+    return func.f_unaccent(func.lower(column))
+
+
+def fuzzy_contains(column, term: str):
+    """Cautare partiala, fara diacritice si case-insensitive, servita de indexul pg_trgm."""
+    cleaned = normalize_search_term(term)
+    escaped = cleaned.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return unaccent_lower(column).like(f"%{escaped}%", escape="\\")
+
+
+def apply_listing_filters(
+    query,
+    transaction_type: Optional[str] = "SALE",
+    min_price=None,
+    max_price=None,
+    min_sqm=None,
+    rooms=None,
+    neighborhood=None,
+    q=None,
+):
+    """Filtrele comune pentru /listings, harta si restul cautarilor (transaction_type=None -> ambele tipuri)."""
+    query = query.filter(models.Listing.status == 'ACTIVE')
+    if transaction_type:
+        query = query.filter(models.Listing.transaction_type == transaction_type)
+    if min_price:
+        query = query.filter(models.Listing.price_eur >= min_price)
+    if max_price:
+        query = query.filter(models.Listing.price_eur <= max_price)
+    if min_sqm:
+        query = query.filter(models.Listing.sqm >= min_sqm)
+    if rooms:
+        query = query.filter(models.Listing.rooms >= rooms)
+    if neighborhood and neighborhood.strip():
+        query = query.filter(fuzzy_contains(models.Listing.neighborhood, neighborhood))
+    if q and q.strip():
+        query = query.filter(or_(
+            fuzzy_contains(models.Listing.neighborhood, q),
+            fuzzy_contains(models.Listing.address, q)
+        ))
+    return query
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+import joblib
+import pandas as pd
+from cachetools import LRUCache
+
+# Coloanele exact in ordinea si forma de la antrenare (vezi ai/train_model.py)
+FEATURE_COLUMNS = ['sqm', 'rooms', 'floor', 'year_built', 'neighborhood', 'compartmentation', 'condition']
+
+DEFAULT_NEIGHBORHOOD = "iasi"
+DEFAULT_COMPARTMENTATION = "nedecomandat"
+DEFAULT_CONDITION = "standard"
+
+ESTIMATE_CACHE_SIZE = int(os.getenv("ESTIMATE_CACHE_SIZE", "10000"))
+
+PRICE_MODEL_PATH = os.getenv("PRICE_MODEL_PATH") or os.path.join(
+    os.path.dirname(__file__), '..', 'ai', 'price_model.joblib'
+)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))  # secunde intre verificari
+
+Features = Tuple[float, int, int, Optional[int], str, str, str]
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Versiunea modelului = sha1 pe continut, citit pe bucati (fara tot fisierul in memorie)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def normalize_features(sqm, rooms, floor=None, year_built=None, neighborhood=None,
+                       compartmentation=None, condition=None) -> Features:
+    """Acelasi curatat ca la antrenare; tuplul rezultat e si cheia de memoizare."""
+    return (
+        round(float(sqm), 1),
+        int(rooms) if rooms is not None else None,
+        int(floor) if floor is not None else 1,
+        int(year_built) if year_built else None,
+        (neighborhood or DEFAULT_NEIGHBORHOOD).strip().lower(),
+        (compartmentation or DEFAULT_COMPARTMENTATION).strip().lower(),
+        (condition or DEFAULT_CONDITION).strip().lower(),
+    )
+
+
+def predict_prices(model, rows: Sequence[Features]) -> List[int]:
+    """Un singur apel vectorizat predict() pentru toate randurile."""
+    if not rows:
+        return []
+    frame = pd.DataFrame.from_records(list(rows), columns=FEATURE_COLUMNS)
+    return [int(p) for p in model.predict(frame)]
+
+
+class EstimateCache:
+    """Memoizare pe tuplul normalizat de feature-uri; se goleste cand se schimba modelul."""
+
+    def __init__(self, maxsize: int = ESTIMATE_CACHE_SIZE):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._model = None
+
+    def estimate_many(self, model, rows: Sequence[Features]) -> List[int]:
+        with self._lock:
+            if model is not self._model:
+                self._cache.clear()
+                self._model = model
+            results = [self._cache.get(row) for row in rows]
+
+        # Doar randurile necunoscute ajung la model, tot intr-un singur apel
+        missing = list(dict.fromkeys(row for row, value in zip(rows, results) if value is None))
+        if missing:
+            predicted = dict(zip(missing, predict_prices(model, missing)))
+            with self._lock:
+                if model is self._model:
+                    self._cache.update(predicted)
+            results = [value if value is not None else predicted[row] for row, value in zip(rows, results)]
+        return results
+
+    def estimate(self, model, row: Features) -> int:
+        return self.estimate_many(model, [row])[0]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class ModelStore:
+    """
+    Modelul de pret. In productie (gunicorn.conf.py, preload_app) e incarcat o data in procesul
+    master, inainte de fork, iar workerii ii impart paginile (copy-on-write). mmap nu ajuta:
+    la deserializare sklearn copiaza array-urile arborilor. ai_worker e alt proces, cu copia lui.
+    La schimbarea fisierului (re-antrenare) noul model e incarcat alaturi si apoi inlocuit
+    atomic; request-urile in curs isi termina predictia pe modelul vechi. Modelul reincarcat
+    intr-un worker e privat pana la urmatorul `kill -HUP` pe master (vezi on_reload).
+    """
+
+    def __init__(self, path: str = PRICE_MODEL_PATH, interval: float = MODEL_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._model = None
+        self._info = {"loaded": False, "version": None, "loaded_at": None, "load_seconds": None, "reloads": 0}
+        self._file_stamp = None
+        self._loaded_pid = None
+        self._lock = threading.Lock()  # un singur reload odata
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self):
+        return self._model
+
+    def info(self) -> dict:
+        # preloaded: modelul curent vine din master (pagini comune), nu dintr-un reload local
+        preloaded = self._loaded_pid is not None and self._loaded_pid != os.getpid()
+        return {**self._info, "path": os.path.abspath(self.path), "preloaded": preloaded}
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self) -> bool:
+        with self._lock:
+            stamp = self._stamp()
+            if stamp is None:
+                print("No AI model found. Run 'python ai/train_model.py' to create one.")
+                return False
+            if stamp == self._file_stamp:
+                return True
+
+            started = time.perf_counter()
+            try:
+                model = joblib.load(self.path)
+                version = file_digest(self.path)
+            except Exception as e:
+                # Pastram modelul vechi (daca exista); reincercam la urmatoarea verificare
+                print(f"Could not load AI model: {e}")
+                self._info["last_error"] = str(e)
+                return False
+
+            reloaded = self._model is not None
+            self._model = model  # swap atomic (o singura atribuire)
+            self._file_stamp = stamp
+            self._loaded_pid = os.getpid()
+            self._info.update({
+                "loaded": True,
+                "version": version,
+                "loaded_at": datetime.now(timezone.utc).isoformat(),
+                "load_seconds": round(time.perf_counter() - started, 3),
+                "reloads": self._info["reloads"] + (1 if reloaded else 0),
+                "last_error": None,
+            })
+            print(f"AI Price Model {'reloaded' if reloaded else 'loaded'} (versiune {version})")
+            return True
+
+    def maybe_reload(self):
+        """Reincarca doar daca fisierul s-a schimbat (ieftin: un singur stat())."""
+        stamp = self._stamp()
+        if stamp is not None and stamp != self._file_stamp:
+            self.load()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.maybe_reload()
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="price-model-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+
+estimate_cache = EstimateCache()
+price_model_store = ModelStore()
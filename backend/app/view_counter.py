@@ -0,0 +1,121 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+# --- CONFIGURARE ---
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "10"))  # secunde intre flush-uri
+VIEW_COUNT_SKIP_BOTS = os.getenv("VIEW_COUNT_SKIP_BOTS", "false").lower() == "true"
+
+# Doar crawleri care se anunta ca atare; clientii HTTP generici (curl, httpx, aplicatii) se numara
+BOT_USER_AGENT = re.compile(
+    r"googlebot|bingbot|yandexbot|baiduspider|duckduckbot|slurp|applebot|ahrefsbot|semrushbot|"
+    r"facebookexternalhit|twitterbot|linkedinbot|whatsapp|telegrambot|discordbot|slackbot",
+    re.IGNORECASE,
+)
+
+
+def is_countable_view(headers) -> bool:
+    """Nu numaram prefetch-urile (Next.js/browser) si, optional, crawlerii."""
+    purpose = (headers.get("sec-purpose") or headers.get("purpose") or headers.get("x-moz") or "").lower()
+    if "prefetch" in purpose or headers.get("next-router-prefetch"):
+        return False
+    if VIEW_COUNT_SKIP_BOTS:
+        if BOT_USER_AGENT.search(headers.get("user-agent") or ""):
+            return False
+    return True
+
+
+def views_clock() -> datetime:
+    """Momentul resetarii, pe acelasi ceas ca incrementele din record() (al serverelor API, nu now() din DB)."""
+    return datetime.now(timezone.utc)
+
+
+class ViewCounter:
+    """
+    Buffer in memorie (per worker) pentru vizualizari.
+    Detaliul anuntului doar incrementeaza un contor local, pe secunda; un thread scrie periodic
+    toate incrementele intr-un singur UPDATE ... FROM (VALUES ...). Incrementele dinainte de
+    listings.views_reset_at sunt ignorate, deci o resetare facuta prin alt worker ramane valabila.
+    """
+
+    def __init__(self, engine, interval: float = VIEW_FLUSH_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, listing_id: int):
+        with self._lock:
+            self._pending[(listing_id, int(time.time()))] += 1
+
+    def discard(self, listing_id: int):
+        """Ex: la resetarea vizualizarilor; ceilalti workeri sunt filtrati de views_reset_at."""
+        with self._lock:
+            for key in [key for key in self._pending if key[0] == listing_id]:
+                del self._pending[key]
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+
+        # Un rand per anunt: incrementele lui pe secunde, ca array-uri paralele
+        per_listing = defaultdict(lambda: ([], []))
+        for (listing_id, second), count in batch.items():
+            counts, seconds = per_listing[listing_id]
+            counts.append(count)
+            seconds.append(datetime.fromtimestamp(second, timezone.utc))
+
+        params = {}
+        values = []
+        for i, (listing_id, (counts, seconds)) in enumerate(per_listing.items()):
+            params[f"id{i}"] = listing_id
+            params[f"n{i}"] = counts
+            params[f"at{i}"] = seconds
+            values.append(f"(CAST(:id{i} AS integer), CAST(:n{i} AS integer[]), CAST(:at{i} AS timestamptz[]))")
+
+        # UPDATE direct (nu prin ORM): nu atinge updated_at, deci nu muta anuntul in feed.
+        # Filtrul pe views_reset_at e in SET, deci e evaluat pe versiunea curenta a randului
+        # (si dupa ce asteptam o resetare concurenta); secunda resetarii e aruncata intreaga.
+        statement = text(f"""
+            UPDATE listings AS l
+            SET views = COALESCE(l.views, 0) + (
+                SELECT COALESCE(sum(u.n), 0) FROM unnest(v.n, v.at) AS u(n, at)
+                WHERE l.views_reset_at IS NULL OR u.at >= l.views_reset_at
+            )
+            FROM (VALUES {", ".join(values)}) AS v(id, n, at)
+            WHERE l.id = v.id
+        """)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(statement, params)
+        except Exception as e:
+            print(f"View counter: flush esuat ({e}), pastrez {sum(batch.values())} vizualizari")
+            with self._lock:
+                self._pending.update(batch)
+            return 0
+        return len(per_listing)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="view-counter-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        self.flush()
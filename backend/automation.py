@@ -2,6 +2,30 @@ import schedule
 import time
 import subprocess
 import datetime
+from app.database import engine
+from app.query_cache import notify_listings_changed, query_cache
+from app.market_stats import refresh_neighborhood_stats
+
+def publish_listings_changed(stage):
+    # Dupa fiecare etapa, API-ul (toti workerii) isi invalideaza cache-ul de cautari
+    try:
+        with engine.begin() as conn:
+            notify_listings_changed(conn, stage)
+        # Generatia comuna din Redis (daca e configurat) o creste doar procesul care a scris
+        query_cache.bump()
+    except Exception as e:
+        print(f"Nu am putut notifica API-ul dupa {stage}: {e}")
+
+def refresh_market_stats():
+    # Statisticile per cartier (view materializat) se recalculeaza o data per ciclu;
+    # NOTIFY-ul din aceeasi tranzactie invalideaza si /stats/neighborhoods din cache
+    try:
+        with engine.begin() as conn:
+            refresh_neighborhood_stats(conn)
+            notify_listings_changed(conn, "neighborhood_stats")
+        query_cache.bump()
+    except Exception as e:
+        print(f"Nu am putut reimprospata neighborhood_stats: {e}")
 
 def run_pipeline():
     print(f"\nPORNIRE CICLU AUTOMAT: {datetime.datetime.now()}")
@@ -9,21 +33,29 @@ def run_pipeline():
     # 1. Rulam SCRAPER (aduce date noi)
     print("1. Pornire Scraper...")
     subprocess.run(["python", "real_scraper.py"])
+    publish_listings_changed("real_scraper")
     
     # 2. Rulam ENRICHER (aduce detalii extra)
     print("2. Pornire Enricher...")
     subprocess.run(["python", "enricher.py"])
+    publish_listings_changed("enricher")
 
     # 3. Rulam PROCESSOR (scoate duplicatele)
     # Putem sa-l rulam de 2-3 ori ca sa fim siguri ca a terminat tot, daca sunt multe
     print("3. Pornire Image Processor...")
     subprocess.run(["python", "processor_images.py"])
+    publish_listings_changed("processor_images")
+
+    # 4. Statistici de piata (folosite de ai_worker, CMA si /stats/neighborhoods)
+    print("4. Reimprospatare statistici cartiere...")
+    refresh_market_stats()
     
     print(f"CICLU FINALIZAT: {datetime.datetime.now()}\n")
 
 def run_janitor_job():
     print("\nPORNIRE CURATENIE")
     subprocess.run(["python", "janitor.py"])
+    publish_listings_changed("janitor")
     print("CURATENIE FINALIZATA\n")
 
 
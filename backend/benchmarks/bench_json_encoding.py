@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: codarea unui raspuns /listings cu 100 si 1000 de anunturi (schemas.ListingOut).
+  - stdlib:       jsonable_encoder + json.dumps (ce facea JSONResponse implicit)
+  - orjson:       jsonable_encoder + orjson (ORJSONResponse, acum default_response_class)
+  - pydantic-core: TypeAdapter.dump_json (calea folosita de /listings si /listings/{id})
+Si cati bytes pleaca pe fir: necomprimat, gzip (nivelul din COMPRESSION_LEVEL) si brotli (daca e instalat).
+
+Nu are nevoie de baza de date; obiectele sunt construite in memorie.
+Rulare (din backend/): python benchmarks/bench_json_encoding.py
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SIZES = [100, 1000]
+REPEAT = 20
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+NEIGHBORHOODS = ["Pacurari", "Copou", "Tatarasi", "Nicolina", "Centru", "Galata", "Alexandru cel Bun"]
+
+
+def build_listings(n):
+    random.seed(42)
+    now = datetime(2025, 1, 1)
+    items = []
+    for i in range(n):
+        images = [f"https://frankfurt.apollo.olx.ro/v1/files/{random.getrandbits(64):x}/image;s=1000x700"
+                  for _ in range(random.randint(5, 15))]
+        items.append(schemas.ListingOut(
+            id=i, title=f"Apartament {random.randint(1, 4)} camere, {random.choice(NEIGHBORHOODS)}",
+            price_eur=random.randint(40_000, 250_000), sqm=random.randint(30, 120),
+            rooms=random.randint(1, 4), floor=random.randint(0, 10),
+            neighborhood=random.choice(NEIGHBORHOODS), transaction_type="SALE",
+            description=" ".join(random.choice(["Apartament", "luminos", "renovat", "bloc", "nou", "centrala",
+                                                "parcare", "balcon", "mobilat", "zona", "linistita"])
+                                 for _ in range(random.randint(80, 300))),
+            images=images, image_url=images[0],
+            lat=47.12 + random.random() * 0.08, lng=27.55 + random.random() * 0.1,
+            created_at=now - timedelta(days=random.randint(0, 90)), updated_at=now,
+            views=random.randint(0, 500), favorites_count=random.randint(0, 20),
+        ))
+    return items
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        out = fn()
+    return (time.perf_counter() - start) / REPEAT * 1000, out
+
+
+def main():
+    for n in SIZES:
+        items = build_listings(n)
+        print(f"\n=== {n} anunturi ===")
+
+        encoders = {
+            "stdlib (json.dumps)": lambda: json.dumps(
+                jsonable_encoder(items, by_alias=True), ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8"),
+            "orjson (ORJSONResponse)": lambda: orjson.dumps(jsonable_encoder(items, by_alias=True)),
+            "pydantic-core dump_json": lambda: schemas.ListingOutList.dump_json(items, by_alias=True),
+        }
+        body = None
+        for label, fn in encoders.items():
+            ms, body = timed(fn)
+            print(f"{label:<26} {ms:8.2f} ms")
+
+        print(f"{'necomprimat':<26} {len(body) / 1024:8.1f} KB")
+        ms, gz = timed(lambda: gzip.compress(body, compresslevel=COMPRESSION_LEVEL))
+        print(f"{f'gzip (nivel {COMPRESSION_LEVEL})':<26} {len(gz) / 1024:8.1f} KB  ({ms:.2f} ms)")
+        if brotli is not None:
+            ms, br = timed(lambda: brotli.compress(body, quality=COMPRESSION_LEVEL))
+            print(f"{f'brotli (quality {COMPRESSION_LEVEL})':<26} {len(br) / 1024:8.1f} KB  ({ms:.2f} ms)")
+        else:
+            print("brotli                     (neinstalat: pip install brotli-asgi)")
+
+
+if __name__ == "__main__":
+    main()
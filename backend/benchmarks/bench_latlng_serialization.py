@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: serializarea a 10.000 de anunturi prin schemas.ListingOut.
+  - inainte: lat/lng erau @property care apelau to_shape() (decodare WKB cu Shapely) de 2 ori per rand
+  - acum:    lat/lng sunt column_property (ST_Y/ST_X) si vin din SELECT ca float-uri simple
+
+Nu are nevoie de baza de date; obiectele sunt construite in memorie.
+Rulare (din backend/): python benchmarks/bench_latlng_serialization.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from geoalchemy2.shape import from_shape, to_shape
+from shapely.geometry import Point
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import models, schemas
+
+N = 10_000
+
+
+class OldListing:
+    """Copie a vechiului comportament din models.Listing (pentru comparatie)."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    @property
+    def lat(self):
+        try:
+            if self.geom:
+                return to_shape(self.geom).y
+        except: pass
+        return None
+
+    @property
+    def lng(self):
+        try:
+            if self.geom:
+                return to_shape(self.geom).x
+        except: pass
+        return None
+
+
+def base_fields(i):
+    return dict(
+        id=i, title=f"Apartament {i}", price_eur=random.randint(40_000, 250_000),
+        sqm=random.randint(30, 120), rooms=random.randint(1, 4), floor=2,
+        neighborhood="Pacurari", transaction_type="SALE", images=[], views=0,
+        favorites_count=0, is_claimed=False, agent_profile=None,
+    )
+
+
+def build_rows():
+    random.seed(42)
+    old_rows, new_rows = [], []
+    for i in range(N):
+        lng, lat = 27.55 + random.random() * 0.1, 47.12 + random.random() * 0.08
+        fields = base_fields(i)
+        old_rows.append(OldListing(geom=from_shape(Point(lng, lat), srid=4326), **fields))
+
+        fields.pop("agent_profile")
+        listing = models.Listing(**fields)
+        set_committed_value(listing, "agent_profile", None)
+        # Asa arata randul dupa un SELECT: lat/lng sunt deja float-uri
+        set_committed_value(listing, "lat", lat)
+        set_committed_value(listing, "lng", lng)
+        new_rows.append(listing)
+    return old_rows, new_rows
+
+
+def bench(label, rows):
+    start = time.perf_counter()
+    for row in rows:
+        schemas.ListingOut.model_validate(row)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms  ({elapsed / len(rows) * 1e6:.1f} us/rand)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    old_rows, new_rows = build_rows()
+    before = bench("inainte (to_shape x2)", old_rows)
+    after = bench("acum (column_property)", new_rows)
+    print(f"Speedup: {before / after:.1f}x")
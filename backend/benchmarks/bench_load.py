@@ -0,0 +1,83 @@
+"""
+Benchmark de incarcare pentru rutele fierbinti (async): /listings, /listings/{id}, /chat/conversations.
+Masoara throughput-ul si latenta la 50 / 200 / 500 de clienti concurenti.
+
+Porneste API-ul separat, de ex:
+    uvicorn app.main:app --workers 4
+apoi (din backend/):
+    python benchmarks/bench_load.py --base-url http://127.0.0.1:8000 --duration 20 --listing-id 1
+Optional --token <JWT> ca sa includa si inbox-ul.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+CONCURRENCY_LEVELS = [50, 200, 500]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def client_loop(client, paths, headers, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            res = await client.get(path, headers=headers)
+            if res.status_code >= 400:
+                errors.append(res.status_code)
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def run_level(base_url, paths, headers, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            client_loop(client, paths, headers, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+    rps = len(latencies) / duration
+    print(f"{concurrency:>5} clienti | {rps:8.1f} req/s | p50 {percentile(latencies, 50):7.1f} ms"
+          f" | p99 {percentile(latencies, 99):7.1f} ms | erori {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=os.getenv("API_URL", "http://127.0.0.1:8000"))
+    parser.add_argument("--duration", type=int, default=20)
+    parser.add_argument("--listing-id", type=int, default=1)
+    parser.add_argument("--token", default=None)
+    args = parser.parse_args()
+
+    paths = [
+        "/listings?limit=24&view=summary",
+        "/listings?limit=24&transaction_type=RENT&view=summary",
+        f"/listings/{args.listing_id}?increment_view=false",
+    ]
+    headers = {}
+    if args.token:
+        headers["Authorization"] = f"Bearer {args.token}"
+        paths.append("/chat/conversations")
+
+    print(f"Tinta: {args.base_url} | {args.duration}s per nivel | rute: {', '.join(paths)}")
+    for level in CONCURRENCY_LEVELS:
+        asyncio.run(run_level(args.base_url, paths, headers, level, args.duration))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
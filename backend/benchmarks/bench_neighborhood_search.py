@@ -0,0 +1,63 @@
+"""
+Compara planul de executie pentru cautarea dupa cartier:
+  - varianta veche: neighborhood ILIKE '%x%'  (seq scan pe listings)
+  - varianta noua:  f_unaccent(lower(neighborhood)) LIKE '%x%'  (bitmap scan pe indexul GIN pg_trgm)
+
+Rulare (din backend/, dupa python migrate_db.py):
+    python benchmarks/bench_neighborhood_search.py "Păcurari"
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from app.database import engine
+from app.utils.search import normalize_search_term
+
+RUNS = 20
+
+OLD_QUERY = """
+    SELECT id FROM listings
+    WHERE status = 'ACTIVE' AND neighborhood ILIKE :pattern
+"""
+
+NEW_QUERY = """
+    SELECT id FROM listings
+    WHERE status = 'ACTIVE' AND f_unaccent(lower(neighborhood)) LIKE :pattern
+"""
+
+
+def explain(conn, sql, pattern):
+    rows = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), {"pattern": pattern}).fetchall()
+    return "\n".join(r[0] for r in rows)
+
+
+def timed(conn, sql, pattern):
+    durations = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        conn.execute(text(sql), {"pattern": pattern}).fetchall()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return durations[len(durations) // 2]
+
+
+def main():
+    term = sys.argv[1] if len(sys.argv) > 1 else "Păcurari"
+    old_pattern = f"%{term}%"
+    new_pattern = f"%{normalize_search_term(term)}%"
+
+    with engine.connect() as conn:
+        print(f"=== VECHI: ILIKE '{old_pattern}' ===")
+        print(explain(conn, OLD_QUERY, old_pattern))
+        print(f"Mediana: {timed(conn, OLD_QUERY, old_pattern):.2f} ms\n")
+
+        print(f"=== NOU: f_unaccent(lower(...)) LIKE '{new_pattern}' ===")
+        print(explain(conn, NEW_QUERY, new_pattern))
+        print(f"Mediana: {timed(conn, NEW_QUERY, new_pattern):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: latenta estimarii de pret pentru 1 vs 1000 de proprietati.
+  - per rand:  un DataFrame + un predict() pentru fiecare proprietate (vechiul /api/ai/estimate-price)
+  - batch:     un singur predict() vectorizat (/api/ai/estimate-price/batch)
+  - memoizat:  aceleasi caracteristici cerute din nou (EstimateCache)
+
+Are nevoie de modelul antrenat (python ai/train_model.py), nu si de baza de date.
+Rulare (din backend/): python benchmarks/bench_price_estimation.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import joblib
+
+from app.valuation import EstimateCache, normalize_features, predict_prices
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'ai', 'price_model.joblib')
+REPEAT = 30
+
+NEIGHBORHOODS = ["pacurari", "copou", "tatarasi", "nicolina", "centru", "galata", "cug", "dacia"]
+CONDITIONS = ["standard", "renovated", "modern", "luxury", "fixer-upper"]
+
+
+def random_rows(n):
+    return [normalize_features(
+        random.randint(30, 120), random.randint(1, 4), random.randint(0, 10),
+        random.randint(1960, 2024), random.choice(NEIGHBORHOODS),
+        random.choice(["decomandat", "semidecomandat", "nedecomandat"]), random.choice(CONDITIONS)
+    ) for _ in range(n)]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench(label, fn, repeat=REPEAT):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<34} p50 {percentile(samples, 50):9.2f} ms | p99 {percentile(samples, 99):9.2f} ms")
+
+
+def main():
+    model = joblib.load(MODEL_PATH)
+    random.seed(42)
+    one, thousand = random_rows(1), random_rows(1000)
+
+    bench("1 rand", lambda: predict_prices(model, one))
+    # Lent (un predict ~zeci de ms pe 200 de arbori), deci doar cateva repetari
+    bench("1000 randuri, cate un predict", lambda: [predict_prices(model, [row]) for row in thousand], repeat=3)
+    bench("1000 randuri, un singur predict", lambda: predict_prices(model, thousand))
+
+    cache = EstimateCache()
+    cache.estimate_many(model, thousand)
+    bench("1 rand memoizat", lambda: cache.estimate(model, thousand[0]))
+    bench("1000 randuri memoizate", lambda: cache.estimate_many(model, thousand))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Harness local pentru chat-ul realtime (/ws/chat): N clienti simulati (cumparatori) scriu
+vanzatorului unui anunt; masuram cat dureaza pana cand evenimentul ajunge pe socket-ul vanzatorului.
+
+Tokenurile sunt generate local, deci API-ul trebuie pornit cu SUPABASE_JWT_SECRET setat
+(si AUTH_REMOTE_CHECK=false). Cu mai multi workeri se verifica si fan-out-ul prin NOTIFY:
+    uvicorn app.main:app --workers 4
+apoi (din backend/):
+    python benchmarks/chat_ws_harness.py --listing-id 1 --seller-id <uuid proprietar> --clients 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import httpx
+import jwt
+import websockets
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def make_token(user_id: str) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "aud": os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated"),
+              "iat": now, "exp": now + 3600, "role": "authenticated"}
+    return jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def buyer(base_url, ws_url, listing_id, user_id, sent_at, connected, delivered_to_buyer):
+    token = make_token(user_id)
+    async with websockets.connect(f"{ws_url}/ws/chat?token={token}") as ws:
+        connected.append(user_id)
+        await asyncio.sleep(0.5)  # lasam toti clientii sa se conecteze
+
+        content = f"harness {uuid.uuid4()}"
+        sent_at[content] = time.perf_counter()
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            res = await client.post("/chat/send", json={"listing_id": listing_id, "content": content},
+                                    headers={"Authorization": f"Bearer {token}"})
+            res.raise_for_status()
+
+        # Si expeditorul isi primeste propriul mesaj (ex: alt tab deschis)
+        try:
+            while True:
+                event = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+                if event.get("message", {}).get("content") == content:
+                    delivered_to_buyer.append(content)
+                    return
+        except asyncio.TimeoutError:
+            pass
+
+
+async def seller(ws_url, seller_id, sent_at, latencies, expected):
+    token = make_token(seller_id)
+    async with websockets.connect(f"{ws_url}/ws/chat?token={token}") as ws:
+        while len(latencies) < expected:
+            try:
+                event = json.loads(await asyncio.wait_for(ws.recv(), timeout=15))
+            except asyncio.TimeoutError:
+                break
+            content = (event.get("message") or {}).get("content")
+            if content in sent_at:
+                latencies.append((time.perf_counter() - sent_at.pop(content)) * 1000)
+
+
+async def run(args):
+    ws_url = args.base_url.replace("http://", "ws://").replace("https://", "wss://")
+    sent_at, latencies, connected, delivered_to_buyer = {}, [], [], []
+
+    seller_task = asyncio.create_task(
+        seller(ws_url, args.seller_id, sent_at, latencies, args.clients)
+    )
+    await asyncio.sleep(0.5)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        buyer(args.base_url, ws_url, args.listing_id, str(uuid.uuid4()), sent_at, connected, delivered_to_buyer)
+        for _ in range(args.clients)
+    ], return_exceptions=True)
+    await seller_task
+    elapsed = time.perf_counter() - start
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    print(f"Clienti conectati:     {len(connected)}/{args.clients}")
+    print(f"Livrate la vanzator:   {len(latencies)}/{args.clients}")
+    print(f"Livrate la expeditor:  {len(delivered_to_buyer)}/{args.clients}")
+    print(f"Latenta send->push:    p50 {percentile(latencies, 50):.1f} ms | p99 {percentile(latencies, 99):.1f} ms")
+    print(f"Durata totala:         {elapsed:.1f} s | erori {len(errors)}")
+    for e in errors[:5]:
+        print(f"  - {type(e).__name__}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--listing-id", type=int, required=True)
+    parser.add_argument("--seller-id", required=True, help="owner_id-ul anuntului")
+    parser.add_argument("--clients", type=int, default=100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Configurare gunicorn pentru productie (workeri uvicorn).
+preload_app: aplicatia si modelul de pret sunt incarcate o data in procesul master, inainte de
+fork, iar workerii impart paginile modelului (copy-on-write) in loc sa-si tina fiecare copia.
+Dupa o re-antrenare: `kill -HUP <pid master>` reincarca modelul in master si reporneste workerii,
+deci modelul nou e din nou comun (pana atunci fiecare worker il reincarca singur, privat).
+Rulare (din backend/): gunicorn app.main:app -c gunicorn.conf.py
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+
+def _load_shared_model():
+    from app.database import engine
+    from app.valuation import price_model_store
+    price_model_store.load()
+    # Conexiunile deschise la import (create_all) nu trebuie mostenite de workeri
+    engine.dispose()
+    # Obiectele deja create ies din evidenta GC-ului: colectarile din workeri nu le mai
+    # scriu headerele, deci paginile raman comune
+    gc.freeze()
+
+
+# 1. Dupa preload (aplicatia e deja importata in master), inainte de primul fork
+def on_starting(server):
+    _load_shared_model()
+
+
+# 2. La HUP, inainte ca workerii noi sa fie porniti din master
+def on_reload(server):
+    _load_shared_model()
@@ -4,6 +4,7 @@ from curl_cffi import requests as crequests
 from datetime import datetime, timedelta
 from app.database import SessionLocal
 from app import models
+from app.tile_cache import tile_cache
 
 # --- CONFIGURARE ---
 BATCH_SIZE = 50  # Limita ca sa nu blocam IP-ul nostru
@@ -99,6 +100,9 @@ def run_janitor():
             
             # Commit dupa fiecare 
             db.commit()
+
+            if status == "INACTIVE":
+                tile_cache.invalidate_listing(item)
         
         time.sleep(5)  # Pauza finala
 
@@ -0,0 +1,115 @@
+from sqlalchemy import text
+from app.database import engine
+
+# Migrari idempotente pentru o baza de date existenta.
+# create_tables.py creeaza doar tabelele noi (si indexii lor), nu modifica ce exista deja.
+# Rulare: python migrate_db.py
+MIGRATIONS = [
+    # --- Paginare keyset pe feed-ul de anunturi ---
+    "UPDATE listings SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL",
+    "ALTER TABLE listings ALTER COLUMN updated_at SET DEFAULT now()",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_feed
+       ON listings (status, transaction_type, updated_at DESC, id DESC)""",
+
+    # --- Cautare fara diacritice pe cartier / adresa (pg_trgm + unaccent) ---
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() e doar STABLE, deci nu poate fi folosit direct intr-un index
+    """CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+       LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+       SET search_path = public, extensions
+       AS $$ SELECT unaccent('unaccent', $1) $$""",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_neighborhood_trgm
+       ON listings USING gin (f_unaccent(lower(neighborhood)) gin_trgm_ops)""",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_address_trgm
+       ON listings USING gin (f_unaccent(lower(address)) gin_trgm_ops)""",
+
+    # --- Harta: interogari pe viewport (ST_MakeEnvelope && geom) ---
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_listings_geom
+       ON listings USING gist (geom)""",
+
+    # --- Favorite: un singur rand per (user, anunt) + contor recalculat ---
+    """DELETE FROM favorites f
+       USING favorites dup
+       WHERE f.user_id = dup.user_id AND f.listing_id = dup.listing_id AND f.id > dup.id""",
+    """CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_favorites_user_listing
+       ON favorites (user_id, listing_id)""",
+    """DO $$ BEGIN
+         IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_favorites_user_listing') THEN
+           ALTER TABLE favorites ADD CONSTRAINT uq_favorites_user_listing
+             UNIQUE USING INDEX uq_favorites_user_listing;
+         END IF;
+       END $$""",
+    """WITH real AS (
+         SELECT l.id, (SELECT count(*) FROM favorites f WHERE f.listing_id = l.id) AS n
+         FROM listings l
+       )
+       UPDATE listings l SET favorites_count = real.n
+       FROM real
+       WHERE l.id = real.id AND l.favorites_count IS DISTINCT FROM real.n""",
+
+    # --- Inbox chat: ultimul mesaj (LATERAL) + necitite (index partial) ---
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_conversation_history
+       ON messages (conversation_id, created_at DESC, id DESC)""",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_unread
+       ON messages (conversation_id, sender_id) WHERE is_read IS false""",
+
+    # --- Contoare de necitite pe conversatie (badge-urile din inbox) ---
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS buyer_unread integer NOT NULL DEFAULT 0",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS seller_unread integer NOT NULL DEFAULT 0",
+    """UPDATE conversations c SET
+         buyer_unread = (SELECT count(*) FROM messages m
+                         WHERE m.conversation_id = c.id AND m.is_read IS false AND m.sender_id <> c.buyer_id),
+         seller_unread = (SELECT count(*) FROM messages m
+                          WHERE m.conversation_id = c.id AND m.is_read IS false AND m.sender_id <> c.seller_id)""",
+
+    # --- Istoric mesaje paginat pe (created_at, id): indexul vechi fara id nu mai e necesar ---
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_messages_conversation_created",
+
+    # --- Statistici de piata per cartier (refresh la finalul fiecarui ciclu din automation.py) ---
+    # Randul cu neighborhood_key = '_all' e media pe tot orasul (fallback pentru cartiere rare)
+    """CREATE MATERIALIZED VIEW IF NOT EXISTS neighborhood_stats AS
+       WITH priced AS (
+         SELECT f_unaccent(lower(trim(neighborhood))) AS neighborhood_key, neighborhood,
+                transaction_type, price_eur / sqm AS price_sqm, updated_at
+         FROM listings
+         WHERE status = 'ACTIVE' AND transaction_type IN ('SALE', 'RENT')
+           AND price_eur > 0 AND sqm > 0
+       ),
+       scoped AS (
+         SELECT * FROM priced WHERE neighborhood_key IS NOT NULL AND neighborhood_key <> ''
+         UNION ALL
+         SELECT '_all', 'Iasi', transaction_type, price_sqm, updated_at FROM priced
+       )
+       SELECT neighborhood_key,
+              mode() WITHIN GROUP (ORDER BY neighborhood) AS neighborhood,
+              transaction_type,
+              count(*) AS listings_count,
+              percentile_cont(0.25) WITHIN GROUP (ORDER BY price_sqm) AS p25_price_sqm,
+              percentile_cont(0.5) WITHIN GROUP (ORDER BY price_sqm) AS median_price_sqm,
+              percentile_cont(0.75) WITHIN GROUP (ORDER BY price_sqm) AS p75_price_sqm,
+              max(updated_at) AS last_listing_at,
+              now() AS refreshed_at
+       FROM scoped
+       GROUP BY neighborhood_key, transaction_type""",
+    # REFRESH ... CONCURRENTLY cere un index unic pe view
+    """CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_neighborhood_stats
+       ON neighborhood_stats (neighborhood_key, transaction_type)""",
+
+    # --- Resetarea vizualizarilor: incrementele din buffer-ele altor workeri mai vechi de atat nu se mai scriu ---
+    "ALTER TABLE listings ADD COLUMN IF NOT EXISTS views_reset_at timestamptz",
+]
+
+
+def run_migrations():
+    # CREATE INDEX CONCURRENTLY nu poate rula intr-o tranzactie
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in MIGRATIONS:
+            print(f"-> {' '.join(statement.split())[:90]}")
+            conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    print("Aplicam migrarile...")
+    run_migrations()
+    print("Gata!")
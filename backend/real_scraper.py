@@ -7,6 +7,7 @@ from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
 from app.database import SessionLocal 
 from app import models
+from app.tile_cache import tile_cache
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
 import re
@@ -384,6 +385,7 @@ def scrape_storia(target):
                     existing_match.listing_url = listing_url # Actualizam linkul
                     existing_match.updated_at = datetime.now()
                     db.commit()
+                    tile_cache.invalidate_listing(existing_match)
                 else:
                     # print(f"Match gasit (ID {existing_match.id}). Skip.")
                     pass
@@ -413,6 +415,7 @@ def scrape_storia(target):
                 )
                 db.add(new_ad)
                 db.commit() # SALVAM IMEDIAT
+                tile_cache.invalidate_point(float(lng), float(lat))
                 count += 1
                 print(f"[Storia] + Adaugat: {title[:30]}... ({int(price) if price else 0}€)")
             
@@ -470,6 +473,7 @@ def scrape_olx(target):
 
             db = get_db_session()
             count = 0
+            touched_points = [] # Tile-urile de invalidat dupa commit
             
             seen_urls = set()
 
@@ -647,6 +651,7 @@ def scrape_olx(target):
                             existing_match.listing_url = listing_url
                             existing_match.updated_at = datetime.now()
                             db.commit()
+                            tile_cache.invalidate_listing(existing_match)
                         continue
 
 
@@ -669,6 +674,7 @@ def scrape_olx(target):
                         fingerprint=text_fingerprint,
                     )
                     db.add(new_ad)
+                    touched_points.append((float(lng), float(lat)))
                     count += 1
                     
 
@@ -686,6 +692,10 @@ def scrape_olx(target):
 
             db.commit()
             db.close()
+
+            for point_lng, point_lat in touched_points:
+                tile_cache.invalidate_point(point_lng, point_lat)
+
             browser.close()
             print(f"Gata OLX: {count} anunturi noi.")
 
@@ -0,0 +1,97 @@
+"""
+Inbox-ul (/chat/conversations) trebuie sa ruleze acelasi numar de statement-uri SQL
+indiferent cate conversatii are userul (fara N+1 pe ultimul mesaj / necitite / anunt).
+
+Ruleaza pe un Postgres de test (PostGIS e creat daca lipseste): schema si datele sunt
+create intr-o tranzactie anulata la final, deci baza ramane goala.
+Rulare (din backend/, cu pip install pytest):
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL nu e setat (Postgres cu PostGIS)", allow_module_level=True)
+
+# app.database construieste engine-ul sync la import (nu se conecteaza)
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL.replace("+asyncpg", ""))
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.database import make_async_engine
+from app.inbox import fetch_inbox
+
+CONVERSATION_COUNTS = (1, 25)
+
+
+async def add_conversations(session, listing_id, user_id, n):
+    for i in range(n):
+        conv = models.Conversation(listing_id=listing_id, buyer_id=user_id, seller_id=str(uuid.uuid4()),
+                                   buyer_unread=i % 3)
+        session.add(conv)
+        await session.flush()
+        session.add_all([
+            models.Message(conversation_id=conv.id, sender_id=conv.seller_id, content=f"mesaj {i}.{j}")
+            for j in range(3)
+        ])
+    await session.flush()
+
+
+async def count_inbox_statements(engine, session, user_id):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        inbox = await fetch_inbox(session, user_id)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+    return len(statements), inbox
+
+
+async def inbox_statement_counts():
+    engine = make_async_engine(TEST_DATABASE_URL)
+    counts = {}
+    try:
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+                await conn.run_sync(models.Base.metadata.create_all)
+
+                session = AsyncSession(bind=conn, expire_on_commit=False, autoflush=False,
+                                       join_transaction_mode="create_savepoint")
+                listing = models.Listing(title="Apartament test", price_eur=100000, sqm=50, rooms=2)
+                session.add(listing)
+                await session.flush()
+
+                for size in CONVERSATION_COUNTS:
+                    user_id = str(uuid.uuid4())  # user nou, doar cu conversatiile de test
+                    await add_conversations(session, listing.id, user_id, size)
+                    session.expunge_all()  # fara obiecte deja incarcate (ar masca lazy load-uri)
+                    statements, inbox = await count_inbox_statements(engine, session, user_id)
+                    assert len(inbox) == size
+                    assert all(conv.listing is not None and conv.last_message for conv in inbox)
+                    counts[size] = statements
+            finally:
+                await trans.rollback()
+    finally:
+        await engine.dispose()
+    return counts
+
+
+def test_inbox_query_count_is_constant():
+    counts = asyncio.run(inbox_statement_counts())
+    assert counts[CONVERSATION_COUNTS[0]] == 1
+    assert len(set(counts.values())) == 1, f"N+1 in inbox: {counts}"
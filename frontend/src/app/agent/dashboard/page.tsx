@@ -19,6 +19,7 @@ import Navbar from '@/components/Navbar';
 import Link from 'next/link';
 import { useRouter } from 'next/navigation';
 import { createClient } from '../../../../utils/supabase/client';
+import { useChatSocket } from '@/lib/useChatSocket';
 
 export default function AgentDashboard() {
     const [leads, setLeads] = useState<any[]>([]);
@@ -76,26 +77,14 @@ export default function AgentDashboard() {
         
         initData();
 
-        // --- ZONA REALTIME (MAGICĂ) ---
-        // Asta face ca statusul sa se schimbe singur!
-        const channel = supabase
-            .channel('dashboard-realtime')
-            .on(
-                'postgres_changes',
-                { event: '*', schema: 'public', table: 'messages' }, // Ascultam orice modificare pe mesaje
-                (payload) => {
-                    console.log('🔔 Schimbare in mesaje:', payload);
-                    fetchLeadsData(); // Reincarcam lista cand se intampla ceva
-                }
-            )
-            .subscribe();
-
-        return () => {
-            supabase.removeChannel(channel);
-        };
-
     }, [fetchLeadsData, supabase]); 
 
+    // --- ZONA REALTIME ---
+    // Statusul lead-urilor se schimba singur: socket-ul primeste doar evenimentele conversatiilor mele
+    useChatSocket(() => {
+        fetchLeadsData();
+    });
+
     const handleGenerateCMA = async () => {
         if (!selectedListingId) {
             alert("Te rog selectează o proprietate din listă pentru analiză.");
@@ -105,10 +94,17 @@ export default function AgentDashboard() {
         const { data: { session } } = await supabase.auth.getSession();
 
         try {
-            const res = await axios.post(`http://127.0.0.1:8000/agent/generate-cma/${selectedListingId}`, {}, {
-                headers: { Authorization: `Bearer ${session?.access_token}` },
-                responseType: 'blob'
-            });
+            const headers = { Authorization: `Bearer ${session?.access_token}` };
+            // Raportul se genereaza in fundal: primim un job id si verificam starea pana e gata
+            let { data: job } = await axios.post(`http://127.0.0.1:8000/agent/generate-cma/${selectedListingId}`, {}, { headers });
+            const deadline = Date.now() + 120_000;
+            while (job.status === 'pending' && Date.now() < deadline) {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                ({ data: job } = await axios.get(`http://127.0.0.1:8000/agent/cma-jobs/${job.job_id}`, { headers }));
+            }
+            if (job.status !== 'done') throw new Error(job.error || 'Timeout generare raport');
+
+            const res = await axios.get(`http://127.0.0.1:8000${job.pdf_url}`, { headers, responseType: 'blob' });
             const url = window.URL.createObjectURL(new Blob([res.data]));
             const link = document.createElement('a');
             link.href = url;
@@ -23,10 +23,10 @@ export default function FavoritesPage() {
             }
 
             // 2. Cerem favoritele ȘI datele anunțului (JOIN)
-            // Sintaxa 'listings(*)' înseamnă: "Adu-mi toate coloanele din tabelul listings legat de acest favorit"
+            // Cerem doar coloanele afișate pe card (fără descriere, galerie, ai_tags)
             const { data, error } = await supabase
                 .from('favorites')
-                .select('listings(*)')
+                .select('listings(id, title, price_eur, sqm, rooms, neighborhood, image_url, transaction_type, source_platform, is_claimed, favorites_count, created_at)')
                 .eq('user_id', user.id);
 
             if (error) {
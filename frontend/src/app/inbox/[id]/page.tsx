@@ -2,10 +2,11 @@
 import { useEffect, useState, useRef } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import axios from 'axios';
-import { Send, ArrowLeft, Loader2, User, Home } from 'lucide-react'; // Am adaugat Home
+import { Send, ArrowLeft, Loader2, User, Home, ChevronUp } from 'lucide-react'; // Am adaugat Home
 import Navbar from '@/components/Navbar';
 import Link from 'next/link';
 import { createClient } from '../../../../utils/supabase/client';
+import { useChatSocket } from '@/lib/useChatSocket';
 
 export default function ChatPage() {
     const { id: conversationId } = useParams();
@@ -15,6 +16,11 @@ export default function ChatPage() {
     const [userId, setUserId] = useState<string | null>(null);
     const [sending, setSending] = useState(false);
     
+    // Cursoarele istoricului paginat (header-ele X-Prev-Cursor / X-Next-Cursor)
+    const [prevCursor, setPrevCursor] = useState<string | null>(null);
+    const [loadingOlder, setLoadingOlder] = useState(false);
+    const nextCursorRef = useRef<string | null>(null);
+
     // State pentru detaliile casei (Titlu, Poza, Pret)
     const [conversationDetails, setConversationDetails] = useState<any>(null);
 
@@ -70,7 +76,10 @@ export default function ChatPage() {
                 const messagesRes = await axios.get(`http://127.0.0.1:8000/chat/conversations/${conversationId}/messages`, {
                     headers: { Authorization: `Bearer ${session.access_token}` }
                 });
+                // Primim doar coada conversatiei; restul se incarca la cerere
                 setMessages(messagesRes.data);
+                setPrevCursor(messagesRes.headers['x-prev-cursor'] || null);
+                nextCursorRef.current = messagesRes.headers['x-next-cursor'] || null;
 
                 // Cerem detaliile conversatiei (Titlu anunt, Poza)
                 const detailsRes = await axios.get(`http://127.0.0.1:8000/chat/conversations/${conversationId}`, {
@@ -90,38 +99,54 @@ export default function ChatPage() {
         }
     }, [conversationId, router, supabase]);
 
-    // SUPABASE REALTIME
-    useEffect(() => {
-        if (!conversationId) return;
-
-        const channel = supabase
-            .channel(`chat:${conversationId}`)
-            .on(
-                'postgres_changes',
-                {
-                    event: 'INSERT', 
-                    schema: 'public',
-                    table: 'messages',
-                    filter: `conversation_id=eq.${conversationId}` 
-                },
-                (payload) => {
-                    setMessages((prev) => {
-                        if (prev.find(m => m.id === payload.new.id)) return prev;
-                        return [...prev, payload.new];
-                    });
-                }
-            )
-            .subscribe();
+    // REALTIME (WebSocket backend): doar evenimentele conversatiilor mele
+    useChatSocket(async (event) => {
+        if (event.type !== 'message' || !event.message) return;
+        if (String(event.conversation_id) !== String(conversationId)) return;
 
-        return () => {
-            supabase.removeChannel(channel);
-        };
-    }, [conversationId, supabase]);
+        if (event.message.content === null) {
+            // Mesaj prea lung pentru push: cerem doar mesajele de dupa ultimul cunoscut
+            const { data: { session } } = await supabase.auth.getSession();
+            const res = await axios.get(`http://127.0.0.1:8000/chat/conversations/${conversationId}/messages`, {
+                headers: { Authorization: `Bearer ${session?.access_token}` },
+                params: nextCursorRef.current ? { after: nextCursorRef.current } : {}
+            });
+            if (res.headers['x-next-cursor']) nextCursorRef.current = res.headers['x-next-cursor'];
+            setMessages((prev) => [...prev, ...res.data.filter((m: any) => !prev.find(p => p.id === m.id))]);
+            return;
+        }
+
+        const incoming = event.message;
+        setMessages((prev) => {
+            if (prev.find(m => m.id === incoming.id)) return prev;
+            return [...prev, incoming];
+        });
+    });
 
-    // Auto-scroll
+    // Mesaje mai vechi (paginare inapoi)
+    const loadOlder = async () => {
+        if (!prevCursor) return;
+        setLoadingOlder(true);
+        try {
+            const { data: { session } } = await supabase.auth.getSession();
+            const res = await axios.get(`http://127.0.0.1:8000/chat/conversations/${conversationId}/messages`, {
+                headers: { Authorization: `Bearer ${session?.access_token}` },
+                params: { before: prevCursor }
+            });
+            setMessages((prev) => [...res.data, ...prev]);
+            setPrevCursor(res.headers['x-prev-cursor'] || null);
+        } catch (err) {
+            console.error("Eroare la incarcarea mesajelor vechi:", err);
+        } finally {
+            setLoadingOlder(false);
+        }
+    };
+
+    // Auto-scroll (doar cand apare un mesaj nou la final, nu la incarcarea celor vechi)
+    const lastMessageId = messages.length ? messages[messages.length - 1].id : null;
     useEffect(() => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-    }, [messages]);
+    }, [lastMessageId]);
 
     // Trimite Mesaj
     const handleSend = async (e?: React.FormEvent) => {
@@ -201,7 +226,20 @@ export default function ChatPage() {
                         Nu exista mesaje. Scrie primul mesaj!
                     </div>
                 ) : (
-                    messages.map((msg) => {
+                    <>
+                    {prevCursor && (
+                        <div className="flex justify-center">
+                            <button
+                                onClick={loadOlder}
+                                disabled={loadingOlder}
+                                className="flex items-center gap-1 text-xs font-medium text-blue-600 bg-white border border-gray-200 rounded-full px-3 py-1 hover:bg-gray-100 disabled:opacity-50"
+                            >
+                                {loadingOlder ? <Loader2 className="animate-spin" size={14} /> : <ChevronUp size={14} />}
+                                Mesaje mai vechi
+                            </button>
+                        </div>
+                    )}
+                    {messages.map((msg) => {
                         const isMe = msg.sender_id === userId;
                         return (
                             <div key={msg.id} className={`flex ${isMe ? 'justify-end' : 'justify-start'}`}>
@@ -215,7 +253,8 @@ export default function ChatPage() {
                                 </div>
                             </div>
                         );
-                    })
+                    })}
+                    </>
                 )}
                 <div ref={messagesEndRef} />
             </div>
@@ -6,6 +6,7 @@ import { MessageCircle, ArrowRight, Home, ImageOff } from 'lucide-react';
 import Navbar from '@/components/Navbar';
 import { useRouter } from 'next/navigation';
 import { createClient } from '../../../utils/supabase/client';
+import { useChatSocket } from '@/lib/useChatSocket';
 
 export default function InboxPage() {
     const [conversations, setConversations] = useState<any[]>([]);
@@ -34,20 +35,31 @@ export default function InboxPage() {
 
     useEffect(() => {
         fetchConvos();
-
-        // REALTIME: Când vine un mesaj nou în ORICE conversație, reîncărcăm lista
-        // Astfel apare bulina imediat ce primești mesajul
-        const channel = supabase
-            .channel('inbox-realtime')
-            .on('postgres_changes', { event: '*', schema: 'public', table: 'messages' }, () => {
-                console.log("Mesaj nou detectat în Inbox!");
-                fetchConvos();
-            })
-            .subscribe();
-
-        return () => { supabase.removeChannel(channel); };
     }, [router, supabase]);
 
+    // REALTIME: evenimentele vin doar pentru conversatiile mele, cu contorul de necitite deja calculat
+    useChatSocket((event) => {
+        const known = conversations.some(c => c.id === event.conversation_id);
+        if (!known) {
+            // Conversatie noua (ex: primul mesaj de la un client) -> reincarcam lista
+            fetchConvos();
+            return;
+        }
+        setConversations((prev) => {
+            const updated = prev.map(c => c.id !== event.conversation_id ? c : {
+                ...c,
+                unread_count: event.unread_count,
+                has_unread: event.unread_count > 0,
+                ...(event.message ? {
+                    last_message: event.message.content ?? c.last_message,
+                    updated_at: event.message.created_at
+                } : {})
+            });
+            // Conversatia cu mesaj nou urca prima
+            return updated.sort((a, b) => new Date(b.updated_at).getTime() - new Date(a.updated_at).getTime());
+        });
+    });
+
     const getImageUrl = (url: string): string | undefined => {
         if (!url) return undefined;
         if (url.includes('olx')) return `/api/image-proxy?url=${encodeURIComponent(url)}`;
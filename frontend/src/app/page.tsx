@@ -69,6 +69,7 @@ function HomeContent() {
       const currentOffset = isLoadMore ? offset : 0;
       params.append('limit', LIMIT.toString());
       params.append('offset', currentOffset.toString());
+      params.append('view', 'summary');
 
       const res = await axios.get(`http://127.0.0.1:8000/listings?${params.toString()}`);
       const newData = res.data;
@@ -100,6 +101,7 @@ function HomeContent() {
           // Cerem un numar mare pentru harta (ex: 500) ca sa aducem tot
           params.append('limit', '500'); 
           params.append('offset', '0');
+          params.append('view', 'summary');
 
           const res = await axios.get(`http://127.0.0.1:8000/listings?${params.toString()}`);
           setMapListings(res.data); // <--- Populam harta cu TOT ce am gasit
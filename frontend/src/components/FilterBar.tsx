@@ -1,6 +1,7 @@
 'use client';
 
 import { useState, useEffect } from 'react';
+import axios from 'axios';
 import { useRouter, useSearchParams, usePathname } from 'next/navigation';
 import { Search, ChevronDown, Check, X, Bell, TrendingUp, Save, RotateCcw } from 'lucide-react';
 import { Button } from "@/components/ui/button";
@@ -14,6 +15,14 @@ import PriceHistoryChart from './PriceHistoryChart'; // <--- IMPORTA COMPONENTA
 import { createClient } from '../../utils/supabase/client';
 import { Switch } from './ui/switch';
 
+type FacetCount = { value: string | number; label?: string | null; count: number };
+type Facets = {
+    total: number;
+    rooms: FacetCount[];
+    transaction_types: FacetCount[];
+    price_histogram: { min_price: number; max_price: number; count: number }[];
+};
+
 
 export default function FilterBar() {
     const router = useRouter();
@@ -41,6 +50,9 @@ export default function FilterBar() {
     const [notifyEmail, setNotifyEmail] = useState(true);
     const [isSaving, setIsSaving] = useState(false);
 
+    // NUMARATORI (un singur apel, cache-uit pe server la fel ca /listings)
+    const [facets, setFacets] = useState<Facets | null>(null);
+
     // INITIALIZARE
     useEffect(() => {
         setFilters({
@@ -52,6 +64,32 @@ export default function FilterBar() {
         });
     }, [searchParams]);
 
+    useEffect(() => {
+        const params = new URLSearchParams();
+        params.set('transaction_type', searchParams.get('type') || searchParams.get('transaction_type') || 'SALE');
+        const q = searchParams.get('q');
+        const rooms = searchParams.get('rooms');
+        if (q) params.set('q', q);
+        if (searchParams.get('min_price')) params.set('min_price', searchParams.get('min_price')!);
+        if (searchParams.get('max_price')) params.set('max_price', searchParams.get('max_price')!);
+        if (rooms && rooms !== 'all') params.set('rooms', rooms);
+
+        let cancelled = false;
+        axios.get(`http://127.0.0.1:8000/listings/facets?${params.toString()}`)
+            .then(res => { if (!cancelled) setFacets(res.data); })
+            .catch(() => { if (!cancelled) setFacets(null); });
+        return () => { cancelled = true; };
+    }, [searchParams]);
+
+    const typeCount = (type: string) => facets?.transaction_types.find(f => f.value === type)?.count;
+    const roomsCount = (val: string) => {
+        if (!facets) return undefined;
+        // Optiunile sunt "N+ camere": adunam toate valorile >= N
+        const min = val === 'all' ? 0 : Number(val);
+        return facets.rooms.filter(f => Number(f.value) >= min).reduce((sum, f) => sum + f.count, 0);
+    };
+    const maxBucket = Math.max(1, ...(facets?.price_histogram.map(b => b.count) ?? [0]));
+
     // --- FUNCTII URL ---
     const commitFiltersToURL = (currentFilters: typeof filters) => {
         const params = new URLSearchParams(); 
@@ -174,8 +212,8 @@ export default function FilterBar() {
                     </PopoverTrigger>
                     <PopoverContent className="w-48 p-2" align="start">
                         <div className="flex flex-col gap-1">
-                            <button onClick={() => { handleImmediateSelection('transaction_type', 'SALE'); setOpenType(false); }} className={cn("text-left px-4 py-2 rounded text-sm transition-colors", filters.transaction_type === 'SALE' ? 'bg-blue-50 text-blue-600 font-bold' : 'hover:bg-gray-50')}>De Vanzare</button>
-                            <button onClick={() => { handleImmediateSelection('transaction_type', 'RENT'); setOpenType(false); }} className={cn("text-left px-4 py-2 rounded text-sm transition-colors", filters.transaction_type === 'RENT' ? 'bg-blue-50 text-blue-600 font-bold' : 'hover:bg-gray-50')}>De Inchiriat</button>
+                            <button onClick={() => { handleImmediateSelection('transaction_type', 'SALE'); setOpenType(false); }} className={cn("text-left px-4 py-2 rounded text-sm transition-colors", filters.transaction_type === 'SALE' ? 'bg-blue-50 text-blue-600 font-bold' : 'hover:bg-gray-50')}>De Vanzare{typeCount('SALE') !== undefined && <span className="ml-2 text-xs text-gray-400">({typeCount('SALE')})</span>}</button>
+                            <button onClick={() => { handleImmediateSelection('transaction_type', 'RENT'); setOpenType(false); }} className={cn("text-left px-4 py-2 rounded text-sm transition-colors", filters.transaction_type === 'RENT' ? 'bg-blue-50 text-blue-600 font-bold' : 'hover:bg-gray-50')}>De Inchiriat{typeCount('RENT') !== undefined && <span className="ml-2 text-xs text-gray-400">({typeCount('RENT')})</span>}</button>
                         </div>
                     </PopoverContent>
                 </Popover>
@@ -190,6 +228,19 @@ export default function FilterBar() {
                     </PopoverTrigger>
                     <PopoverContent className="w-80 p-4" align="start">
                         <h3 className="font-bold text-gray-700 mb-3 text-sm">Interval Pret (€)</h3>
+                        {facets && facets.price_histogram.length > 0 && (
+                            <div className="flex items-end gap-0.5 h-12 mb-3" title={`${facets.total} anunturi`}>
+                                {facets.price_histogram.map((bucket) => (
+                                    <button
+                                        key={bucket.min_price}
+                                        title={`${Math.round(bucket.min_price)} € - ${Math.round(bucket.max_price)} €: ${bucket.count}`}
+                                        onClick={() => setFilters(prev => ({ ...prev, min_price: String(Math.floor(bucket.min_price)), max_price: String(Math.ceil(bucket.max_price)) }))}
+                                        className="flex-1 bg-blue-200 hover:bg-blue-400 rounded-t transition-colors"
+                                        style={{ height: `${Math.max(4, (bucket.count / maxBucket) * 100)}%` }}
+                                    />
+                                ))}
+                            </div>
+                        )}
                         <div className="flex gap-2 items-center mb-4">
                             <div className="w-1/2"><Input type="number" placeholder="Min" value={filters.min_price} onChange={(e) => handleLocalChange('min_price', e.target.value)} onKeyDown={handleKeyDown} className="h-9" /></div>
                             <span className="text-gray-400">-</span>
@@ -212,7 +263,10 @@ export default function FilterBar() {
                         <div className="flex flex-col gap-1">
                             {['all', '1', '2', '3', '4'].map((val) => (
                                 <button key={val} onClick={() => { handleImmediateSelection('rooms', val); setOpenBeds(false); }} className={cn("text-left px-3 py-2 rounded text-sm flex items-center justify-between transition-colors", (filters.rooms === val || (val === 'all' && filters.rooms === '')) ? 'bg-blue-50 text-blue-600 font-bold' : 'hover:bg-gray-50 text-gray-700')}>
-                                    {val === 'all' ? 'Oricate' : `${val}+ Camere`}
+                                    <span>
+                                        {val === 'all' ? 'Oricate' : `${val}+ Camere`}
+                                        {roomsCount(val) !== undefined && <span className="ml-2 text-xs text-gray-400">({roomsCount(val)})</span>}
+                                    </span>
                                     {(filters.rooms === val || (val === 'all' && filters.rooms === '')) && <Check className="h-4 w-4 text-blue-600" />}
                                 </button>
                             ))}
@@ -0,0 +1,50 @@
+'use client';
+import { useEffect, useRef } from 'react';
+import { createClient } from '../../utils/supabase/client';
+
+export type ChatEvent = {
+    type: 'message' | 'read';
+    conversation_id: number;
+    unread_count: number;
+    message?: {
+        id: number;
+        conversation_id: number;
+        sender_id: string;
+        content: string | null; // null = mesaj prea lung pentru push, se cere prin GET
+        is_read: boolean;
+        created_at: string;
+    };
+};
+
+// Canal unic per user (backend: /ws/chat), in locul abonarii la toata tabela 'messages'
+export function useChatSocket(onEvent: (event: ChatEvent) => void) {
+    const handlerRef = useRef(onEvent);
+    handlerRef.current = onEvent;
+
+    useEffect(() => {
+        const supabase = createClient();
+        let socket: WebSocket | null = null;
+        let retryTimer: ReturnType<typeof setTimeout> | null = null;
+        let stopped = false;
+
+        const connect = async () => {
+            const { data: { session } } = await supabase.auth.getSession();
+            if (!session || stopped) return;
+
+            socket = new WebSocket(`ws://127.0.0.1:8000/ws/chat?token=${session.access_token}`);
+            socket.onmessage = (e) => handlerRef.current(JSON.parse(e.data));
+            socket.onclose = () => {
+                // Reconectare simpla (ex: restart API sau token expirat)
+                if (!stopped) retryTimer = setTimeout(connect, 3000);
+            };
+        };
+
+        connect();
+
+        return () => {
+            stopped = true;
+            if (retryTimer) clearTimeout(retryTimer);
+            socket?.close();
+        };
+    }, []);
+}